@@ -1,21 +1,157 @@
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
 from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
 from Crypto.Random import get_random_bytes
+from Crypto.Protocol.KDF import scrypt
+
+NONCE_SIZE = 8  # CTR nonce; followed by an 8-byte big-endian initial counter in every ciphertext
+HEADER_SIZE = NONCE_SIZE + 8
+
+
+def _counter_blocks(nonce, start, count):
+    """Build the CTR input blocks nonce || counter for counters start .. start+count-1."""
+    if count == 1:
+        return nonce + start.to_bytes(8, 'big')
+    blocks = bytearray(16 * count)
+    counters = struct.pack(f'>{count}Q', *range(start, start + count))
+    for j in range(8):
+        blocks[j::16] = bytes([nonce[j]]) * count
+        blocks[8 + j::16] = counters[j::8]
+    return bytes(blocks)
+
+
+def _xor(data, keystream):
+    """XOR two equal-length byte strings."""
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream, 'big')).to_bytes(len(data), 'big')
+
 
 class EncryptionUtils:
-    def __init__(self):
-        self.key = get_random_bytes(32)  # 256-bit key
+    def __init__(self, key=None, token_cache_size=4096):
+        """
+        Randomized AES-CTR encryption and keyed deterministic tokens.
+        Both AES key schedules are built once here and reused: CTR keystreams are produced with
+        the cached ECB cipher, so a whole batch of values costs a single AES call and no padding.
+        :param key: Existing 256-bit key to use, e.g. in a worker process (a random key is generated if None).
+        :param token_cache_size: Number of deterministic tokens kept in the LRU cache (0 disables it).
+        """
+        self.key = key if key is not None else get_random_bytes(32)  # 256-bit key
+        self._cipher = AES.new(self.key, AES.MODE_ECB)
+        self._token_cipher = AES.new(hashlib.sha256(b"seal-token-key" + self.key).digest(), AES.MODE_ECB)
+        self.token_cache = OrderedDict()
+        self._token_cache_lock = threading.Lock()  # tokens_many may run on several service threads
+        self.token_cache_size = token_cache_size
+        self.token_cache_hits = 0
+        self.token_cache_misses = 0
 
     def encrypt_data(self, data):
-        """Encrypt data using AES in CBC mode."""
-        cipher = AES.new(self.key, AES.MODE_CBC)
-        ct_bytes = cipher.encrypt(pad(data.encode('utf-8'), AES.block_size))
-        return cipher.iv + ct_bytes  # Return IV + ciphertext
+        """Encrypt a string using AES in CTR mode."""
+        return self.encrypt_many([data.encode('utf-8')])[0]
 
     def decrypt_data(self, encrypted_data):
-        """Decrypt data using AES in CBC mode."""
-        iv = encrypted_data[:AES.block_size]
-        ct = encrypted_data[AES.block_size:]
-        cipher = AES.new(self.key, AES.MODE_CBC, iv)
-        pt = unpad(cipher.decrypt(ct), AES.block_size)
-        return pt.decode('utf-8')
+        """Decrypt a string encrypted by encrypt_data."""
+        return self.decrypt_many([encrypted_data])[0].decode('utf-8')
+
+    def encrypt_bytes(self, data):
+        """Encrypt raw bytes using AES in CTR mode."""
+        return self.encrypt_many([data])[0]
+
+    def decrypt_bytes(self, encrypted_data):
+        """Decrypt raw bytes encrypted by encrypt_bytes."""
+        return self.decrypt_many([encrypted_data])[0]
+
+    def encrypt_many(self, values):
+        """
+        Encrypt a batch of byte strings under one fresh nonce with a single AES call.
+        Each value starts at its own counter block, so it can be decrypted on its own.
+        :return: List of nonce || initial counter || ciphertext, one per value (no padding).
+        """
+        nonce = get_random_bytes(NONCE_SIZE)
+        starts = []
+        num_blocks = 0
+        for value in values:
+            starts.append(num_blocks)
+            num_blocks += -(-len(value) // 16)
+        keystream = memoryview(self._cipher.encrypt(_counter_blocks(nonce, 0, num_blocks))) if num_blocks else b""
+
+        results = []
+        for value, start in zip(values, starts):
+            offset = start * 16
+            results.append(nonce + start.to_bytes(8, 'big') + _xor(value, keystream[offset:offset + len(value)]))
+        return results
+
+    def decrypt_many(self, encrypted_values):
+        """Decrypt a batch of values from encrypt_many with a single AES call."""
+        lengths = []
+        counter_blocks = []
+        for encrypted in encrypted_values:
+            length = len(encrypted) - HEADER_SIZE
+            start = int.from_bytes(encrypted[NONCE_SIZE:HEADER_SIZE], 'big')
+            counter_blocks.append(_counter_blocks(encrypted[:NONCE_SIZE], start, -(-length // 16)))
+            lengths.append(length)
+        keystream = memoryview(self._cipher.encrypt(b"".join(counter_blocks))) if counter_blocks else b""
+
+        results = []
+        offset = 0
+        for encrypted, length, blocks in zip(encrypted_values, lengths, counter_blocks):
+            results.append(_xor(encrypted[HEADER_SIZE:], keystream[offset:offset + length]))
+            offset += len(blocks)
+        return results
+
+    def deterministic_token(self, data):
+        """Encrypt data deterministically for queryable fields."""
+        return self.tokens_many([data])[0]
+
+    def tokens_many(self, values):
+        """
+        Compute deterministic tokens for a batch of strings: AES under the token key of the
+        first 16 bytes of SHA-256(value). Repeated values are served from an LRU cache and
+        all cache misses share one AES call.
+        """
+        tokens = [None] * len(values)
+        misses = {}
+        with self._token_cache_lock:
+            for i, value in enumerate(values):
+                token = self.token_cache.get(value)
+                if token is not None:
+                    self.token_cache.move_to_end(value)
+                    self.token_cache_hits += 1
+                    tokens[i] = token
+                else:
+                    misses.setdefault(value, []).append(i)
+            self.token_cache_misses += len(misses)
+
+        if misses:
+            digests = b"".join(hashlib.sha256(value.encode('utf-8')).digest()[:16] for value in misses)
+            encrypted = self._token_cipher.encrypt(digests)
+            with self._token_cache_lock:
+                for j, (value, positions) in enumerate(misses.items()):
+                    token = encrypted[16 * j:16 * j + 16]
+                    for i in positions:
+                        tokens[i] = token
+                    if self.token_cache_size:
+                        self.token_cache[value] = token
+                        if len(self.token_cache) > self.token_cache_size:
+                            self.token_cache.popitem(last=False)
+        return tokens
+
+    @staticmethod
+    def derive_key(master_key, salt):
+        """Derive a 256-bit key-encryption key from a user-supplied master key (str or bytes) with scrypt."""
+        if isinstance(master_key, str):
+            master_key = master_key.encode('utf-8')
+        return scrypt(master_key, salt, 32, N=2 ** 14, r=8, p=1)
+
+    @staticmethod
+    def encrypt_blob(key, data):
+        """Encrypt and authenticate bytes with AES-GCM; returns nonce + tag + ciphertext."""
+        cipher = AES.new(key, AES.MODE_GCM)
+        ct, tag = cipher.encrypt_and_digest(data)
+        return cipher.nonce + tag + ct
+
+    @staticmethod
+    def decrypt_blob(key, blob):
+        """Decrypt a blob from encrypt_blob, raising ValueError if the key is wrong or the blob was modified."""
+        nonce, tag, ct = blob[:16], blob[16:32], blob[32:]
+        return AES.new(key, AES.MODE_GCM, nonce=nonce).decrypt_and_verify(ct, tag)
@@ -0,0 +1,143 @@
+import json
+import math
+import time
+import psutil
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Timer:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start_time)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics:
+    """Metrics hook that records nothing; hot paths check 'enabled' before doing any work."""
+    enabled = False
+
+    def timer(self, name):
+        return _NULL_TIMER
+
+    def observe(self, name, value):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class Metrics(NullMetrics):
+    enabled = True
+
+    def __init__(self):
+        """
+        Metrics hook that keeps every observed value per operation name, plus plain counters.
+        Timings are in seconds; other samples (nodes read, stash size, ...) are in their own units.
+        """
+        self.samples = {}
+        self.counters = {}
+
+    def timer(self, name):
+        """Context manager that observes the elapsed seconds of its block under 'name'."""
+        return _Timer(self, name)
+
+    def observe(self, name, value):
+        """Record one sample of 'name'."""
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = []
+        samples.append(value)
+
+    def count(self, name, n=1):
+        """Add n to counter 'name'."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self, reset=False):
+        """Return the raw samples and counters (picklable), optionally clearing them."""
+        snapshot = {"samples": self.samples, "counters": self.counters}
+        if reset:
+            self.samples = {}
+            self.counters = {}
+        else:
+            snapshot = {"samples": {name: list(values) for name, values in self.samples.items()},
+                        "counters": dict(self.counters)}
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add the samples and counters of a snapshot, e.g. one taken in a partition worker."""
+        for name, values in snapshot["samples"].items():
+            self.samples.setdefault(name, []).extend(values)
+        for name, n in snapshot["counters"].items():
+            self.count(name, n)
+
+    def report(self):
+        """Summarize every operation: count, total, mean, min, max, percentiles and a log2 histogram."""
+        operations = {}
+        for name, values in sorted(self.samples.items()):
+            values = sorted(values)
+            summary = {
+                "count": len(values),
+                "total": sum(values),
+                "mean": sum(values) / len(values),
+                "min": values[0],
+                "max": values[-1],
+            }
+            for p in PERCENTILES:
+                summary[f"p{p}"] = percentile(values, p)
+            summary["histogram"] = log2_histogram(values)
+            operations[name] = summary
+        return {"operations": operations, "counters": dict(sorted(self.counters.items()))}
+
+    def export_json(self, path, extra=None):
+        """
+        Write report() and the process RSS to a JSON file.
+        :param path: Output file.
+        :param extra: Optional dict of additional fields (e.g. the run configuration).
+        :return: The exported dict.
+        """
+        data = {
+            "timestamp": time.time(),
+            "rss_bytes": psutil.Process().memory_info().rss,
+            **self.report(),
+        }
+        if extra:
+            data.update(extra)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+        return data
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank p-th percentile of an already sorted, non-empty list."""
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(p / 100 * len(sorted_values)) - 1))]
+
+
+def log2_histogram(values):
+    """Count values per power-of-two bucket; each key is the bucket's upper bound (0 for non-positive values)."""
+    histogram = {}
+    for value in values:
+        bound = 2.0 ** math.ceil(math.log2(value)) if value > 0 else 0
+        histogram[bound] = histogram.get(bound, 0) + 1
+    return {repr(bound): n for bound, n in sorted(histogram.items())}
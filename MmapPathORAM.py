@@ -0,0 +1,117 @@
+import mmap
+import os
+import struct
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from PathORAM import PathORAM
+
+EMPTY_SLOT = -1  # Block ID stored in unused slots
+SLOT_HEADER = struct.Struct('<qqI')  # Block ID, position tag, payload length
+NONCE_SIZE = 8  # AES-CTR nonce stored in front of every bucket
+
+
+class MmapPathORAM(PathORAM):
+    def __init__(self, N, Z, path, block_size=1024, key=None, create=True, **kwargs):
+        """
+        Path ORAM whose tree lives in a memory-mapped file instead of process memory.
+        Each bucket is a contiguous, fixed-size record: an 8-byte nonce followed by its Z slots
+        encrypted together under AES-CTR, so every bucket read or write is one contiguous
+        file region and untouched, empty and full buckets all look alike. A nonce of zero
+        marks a bucket that has never been written.
+        :param N: Total number of blocks.
+        :param Z: Bucket capacity (number of blocks per bucket).
+        :param path: File that holds the tree.
+        :param block_size: Maximum payload size in bytes; block data must be bytes.
+        :param key: 256-bit bucket encryption key (a random key is generated if None).
+        :param create: Create (or truncate) the file; if False, reopen an existing tree file.
+        :param kwargs: Remaining PathORAM options (max_stash_size, overflow, position_map).
+        """
+        self.path = path
+        self.block_size = block_size
+        self.key = key if key is not None else get_random_bytes(32)
+        self.slot_size = SLOT_HEADER.size + block_size
+        self.bucket_size = NONCE_SIZE + Z * self.slot_size
+        self.create = create
+        self.bytes_read = 0
+        self.bytes_written = 0
+        super().__init__(N, Z, **kwargs)
+
+    def _init_tree(self):
+        """Create or reopen the tree file and map it into memory."""
+        file_size = (2 * self.num_leaves - 1) * self.bucket_size
+        if self.create:
+            with open(self.path, 'wb') as f:
+                f.truncate(file_size)
+        elif os.path.getsize(self.path) != file_size:
+            raise ValueError(f"Tree file '{self.path}' does not match N={self.N}, Z={self.Z}, "
+                             f"block_size={self.block_size}.")
+        self.file = open(self.path, 'r+b')
+        self.mmap = mmap.mmap(self.file.fileno(), file_size)
+
+    def _grow_tree(self, old_num_nodes):
+        """Extend the tree file with zeroed (empty) buckets for the added nodes and remap it."""
+        self.mmap.flush()
+        self.mmap.close()
+        file_size = (2 * self.num_leaves - 1) * self.bucket_size
+        self.file.truncate(file_size)
+        self.mmap = mmap.mmap(self.file.fileno(), file_size)
+
+    def _read_bucket(self, node):
+        """Read one bucket as a contiguous region and decrypt its slots."""
+        offset = node * self.bucket_size
+        raw = self.mmap[offset:offset + self.bucket_size]
+        self.bytes_read += self.bucket_size
+        nonce = raw[:NONCE_SIZE]
+        if nonce == bytes(NONCE_SIZE):
+            return []
+
+        plaintext = AES.new(self.key, AES.MODE_CTR, nonce=nonce).decrypt(raw[NONCE_SIZE:])
+        blocks = []
+        for slot in range(0, len(plaintext), self.slot_size):
+            block_id, leaf, length = SLOT_HEADER.unpack_from(plaintext, slot)
+            if block_id != EMPTY_SLOT:
+                start = slot + SLOT_HEADER.size
+                blocks.append((block_id, leaf, plaintext[start:start + length]))
+        return blocks
+
+    def _write_bucket(self, node, blocks):
+        """Encrypt the bucket under a fresh nonce and write it as one contiguous region."""
+        plaintext = bytearray(self.Z * self.slot_size)
+        for slot, (block_id, leaf, data) in enumerate(blocks):
+            if not isinstance(data, (bytes, bytearray)):
+                raise TypeError(f"MmapPathORAM blocks must be bytes, got {type(data).__name__}.")
+            if len(data) > self.block_size:
+                raise ValueError(f"Block {block_id} has {len(data)} bytes, above block_size={self.block_size}.")
+            offset = slot * self.slot_size
+            SLOT_HEADER.pack_into(plaintext, offset, block_id, leaf, len(data))
+            plaintext[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(data)] = data
+        for slot in range(len(blocks), self.Z):
+            SLOT_HEADER.pack_into(plaintext, slot * self.slot_size, EMPTY_SLOT, 0, 0)
+
+        nonce = get_random_bytes(NONCE_SIZE)
+        ciphertext = AES.new(self.key, AES.MODE_CTR, nonce=nonce).encrypt(plaintext)
+        offset = node * self.bucket_size
+        self.mmap[offset:offset + self.bucket_size] = nonce + ciphertext
+        self.bytes_written += self.bucket_size
+
+    def flush(self):
+        """Flush written buckets to the tree file."""
+        self.mmap.flush()
+
+    def close(self):
+        """Flush and unmap the tree file."""
+        self.mmap.flush()
+        self.mmap.close()
+        self.file.close()
+
+    def __getstate__(self):
+        # The mapping cannot be pickled; the tree file is reopened on unpickling
+        self.flush()
+        state = self.__dict__.copy()
+        del state['mmap'], state['file']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.create = False
+        self._init_tree()
@@ -0,0 +1,194 @@
+import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pipe, Process
+
+
+class SerialPartitionPool:
+    def __init__(self, orams):
+        """
+        Run ORAM partition batches one after another in the calling thread.
+        :param orams: List of PathORAM instances, indexed by ORAM ID.
+        """
+        self.orams = orams
+
+    def access_many(self, oram_id, ops):
+        """Run a batch of (op, a, data) operations on one partition."""
+        return self.orams[oram_id].access_many(ops)
+
+    def run(self, batches):
+        """
+        Run per-partition batches.
+        :param batches: Dict of ORAM ID -> list of (op, a, data) operations.
+        :return: Dict of ORAM ID -> list of results.
+        """
+        return {oram_id: self.access_many(oram_id, ops) for oram_id, ops in batches.items()}
+
+    def call(self, method, *args):
+        """Call a method on every partition and return the results in ORAM ID order."""
+        return [getattr(oram, method)(*args) for oram in self.orams]
+
+    def dump(self):
+        """Pickle every partition's ORAM state and return the bytes in ORAM ID order."""
+        return [pickle.dumps(oram, protocol=pickle.HIGHEST_PROTOCOL) for oram in self.orams]
+
+    def close(self):
+        pass
+
+
+class ThreadPartitionPool(SerialPartitionPool):
+    def __init__(self, orams, workers=None):
+        """
+        Run ORAM partition batches concurrently on a thread pool.
+        Each partition has its own lock, so batches for different partitions never wait on each other.
+        :param orams: List of PathORAM instances, indexed by ORAM ID.
+        :param workers: Number of worker threads (defaults to one per partition).
+        """
+        super().__init__(orams)
+        self.locks = [threading.Lock() for _ in orams]
+        self.executor = ThreadPoolExecutor(max_workers=workers or len(orams))
+
+    def access_many(self, oram_id, ops):
+        """Run a batch of (op, a, data) operations on one partition under its lock."""
+        with self.locks[oram_id]:
+            return self.orams[oram_id].access_many(ops)
+
+    def run(self, batches):
+        futures = {oram_id: self.executor.submit(self.access_many, oram_id, ops)
+                   for oram_id, ops in batches.items()}
+        return {oram_id: future.result() for oram_id, future in futures.items()}
+
+    def call(self, method, *args):
+        results = []
+        for oram, lock in zip(self.orams, self.locks):
+            with lock:
+                results.append(getattr(oram, method)(*args))
+        return results
+
+    def dump(self):
+        states = []
+        for oram, lock in zip(self.orams, self.locks):
+            with lock:
+                states.append(pickle.dumps(oram, protocol=pickle.HIGHEST_PROTOCOL))
+        return states
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def _serve_shards(conn, shards):
+    """Worker process loop: hold a shard of ORAMs and answer requests from the parent."""
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        kind, payload = request
+        try:
+            if kind == 'access':
+                response = {oram_id: shards[oram_id].access_many(ops) for oram_id, ops in payload.items()}
+            elif kind == 'call':
+                method, args = payload
+                response = {oram_id: getattr(oram, method)(*args) for oram_id, oram in shards.items()}
+            elif kind == 'dump':
+                response = {oram_id: pickle.dumps(oram, protocol=pickle.HIGHEST_PROTOCOL)
+                            for oram_id, oram in shards.items()}
+            else:
+                raise ValueError(f"Unsupported shard request '{kind}'.")
+            conn.send(('ok', response))
+        except Exception as e:
+            conn.send(('error', e))
+    conn.close()
+
+
+class ProcessPartitionPool:
+    def __init__(self, orams, workers=None):
+        """
+        Hold ORAM partitions in worker processes and run their batches in parallel.
+        Partition i lives in worker i % workers; each worker serves its shard sequentially,
+        and a lock per worker guards its pipe.
+        :param orams: List of PathORAM instances, indexed by ORAM ID; they are moved into the workers.
+        :param workers: Number of worker processes (defaults to the CPU count, at most one per partition).
+        """
+        self.num_orams = len(orams)
+        self.num_workers = max(1, min(workers or os.cpu_count(), self.num_orams))
+        self.conns = []
+        self.processes = []
+        self.locks = []
+        for worker in range(self.num_workers):
+            shards = {oram_id: orams[oram_id] for oram_id in range(worker, self.num_orams, self.num_workers)}
+            parent_conn, child_conn = Pipe()
+            process = Process(target=_serve_shards, args=(child_conn, shards), daemon=True)
+            process.start()
+            child_conn.close()
+            self.conns.append(parent_conn)
+            self.processes.append(process)
+            self.locks.append(threading.Lock())
+
+    def access_many(self, oram_id, ops):
+        """Run a batch of (op, a, data) operations on one partition."""
+        return self.run({oram_id: ops})[oram_id]
+
+    def run(self, batches):
+        """
+        Send every worker its share of the batches, then collect the replies.
+        :param batches: Dict of ORAM ID -> list of (op, a, data) operations.
+        :return: Dict of ORAM ID -> list of results.
+        """
+        by_worker = {}
+        for oram_id, ops in batches.items():
+            by_worker.setdefault(oram_id % self.num_workers, {})[oram_id] = ops
+        return self._request({worker: ('access', payload) for worker, payload in by_worker.items()})
+
+    def call(self, method, *args):
+        """Call a method on every partition and return the results in ORAM ID order."""
+        results = self._request({worker: ('call', (method, args)) for worker in range(self.num_workers)})
+        return [results[oram_id] for oram_id in range(self.num_orams)]
+
+    def dump(self):
+        """Have the workers pickle their shards and return the bytes in ORAM ID order."""
+        results = self._request({worker: ('dump', None) for worker in range(self.num_workers)})
+        return [results[oram_id] for oram_id in range(self.num_orams)]
+
+    def _request(self, requests):
+        # Acquire worker locks in a fixed order so concurrent callers cannot deadlock
+        workers = sorted(requests)
+        for worker in workers:
+            self.locks[worker].acquire()
+        try:
+            for worker in workers:
+                self.conns[worker].send(requests[worker])
+            replies = [self.conns[worker].recv() for worker in workers]
+        finally:
+            for worker in workers:
+                self.locks[worker].release()
+
+        merged = {}
+        for status, response in replies:
+            if status == 'error':
+                raise response
+            merged.update(response)
+        return merged
+
+    def close(self):
+        for conn, process in zip(self.conns, self.processes):
+            conn.send(None)
+            conn.close()
+            process.join()
+        self.conns = []
+        self.processes = []
+
+
+PARTITION_POOLS = {
+    'serial': SerialPartitionPool,
+    'thread': ThreadPartitionPool,
+    'process': ProcessPartitionPool,
+}
+
+def make_partition_pool(backend, orams, workers=None):
+    """Create the partition pool for a backend name ('serial', 'thread' or 'process')."""
+    if backend not in PARTITION_POOLS:
+        raise ValueError(f"Unsupported partition backend '{backend}'.")
+    if backend == 'serial':
+        return SerialPartitionPool(orams)
+    return PARTITION_POOLS[backend](orams, workers=workers)
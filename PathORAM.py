@@ -1,71 +1,428 @@
+import hashlib
+import os
 import random
+import time
+from Metrics import Metrics, NULL_METRICS
+from PositionMap import (DictPositionMap, ArrayPositionMap, RecursivePositionMap,
+                         ENTRIES_PER_BLOCK, RECURSION_CUTOFF)
+
+
+class StashOverflowError(Exception):
+    """Raised when the stash stays above its configured maximum size."""
+
+
+class Stash:
+    def __init__(self):
+        """
+        Client-side stash keyed by block ID.
+        A secondary index maps each leaf to the IDs of the stash blocks assigned to it,
+        so eviction can pick blocks per leaf instead of scanning the whole stash.
+        """
+        self.blocks = {}  # Block ID -> (leaf, data)
+        self.leaf_index = {}  # Leaf -> set of block IDs
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __contains__(self, a):
+        return a in self.blocks
+
+    def get(self, a):
+        """Return (leaf, data) for block 'a', or None if it is not in the stash."""
+        return self.blocks.get(a)
+
+    def add(self, a, leaf, data):
+        """Insert or replace block 'a' with the given leaf and data."""
+        if a in self.blocks:
+            self._unindex(a, self.blocks[a][0])
+        self.blocks[a] = (leaf, data)
+        self.leaf_index.setdefault(leaf, set()).add(a)
+
+    def remove(self, a):
+        """Remove block 'a' and return its (leaf, data)."""
+        leaf, data = self.blocks.pop(a)
+        self._unindex(a, leaf)
+        return leaf, data
+
+    def pop_from_leaf(self, leaf):
+        """Remove an arbitrary block assigned to 'leaf' and return (block ID, data)."""
+        block_ids = self.leaf_index[leaf]
+        a = block_ids.pop()
+        if not block_ids:
+            del self.leaf_index[leaf]
+        return a, self.blocks.pop(a)[1]
+
+    def _unindex(self, a, leaf):
+        block_ids = self.leaf_index[leaf]
+        block_ids.discard(a)
+        if not block_ids:
+            del self.leaf_index[leaf]
+
 
 class PathORAM:
-    def __init__(self, N, Z):
+    MAX_BACKGROUND_EVICTIONS = 32  # Dummy evictions attempted per access before giving up
+    metrics = NULL_METRICS  # Metrics hook; see enable_metrics()
+    trace = None  # Server-visible access trace, or None when not recording; see enable_trace()
+
+    def __init__(self, N, Z, max_stash_size=None, overflow='raise', position_map='dict', growth_threshold=None):
         """
         Initialize a single Path ORAM.
         :param N: Total number of blocks.
         :param Z: Bucket capacity (number of blocks per bucket).
+        :param max_stash_size: Maximum number of blocks left in the stash after an access (None for no limit).
+        :param overflow: What to do when the stash exceeds max_stash_size: 'raise' a StashOverflowError,
+                         or 'evict' by running background evictions along random paths first.
+        :param position_map: Position map implementation: 'dict', 'array' (compact array('I') indexed
+                             by block ID) or 'recursive' (stored in a smaller Path ORAM).
+        :param growth_threshold: Grow the tree (see grow()) once it holds more than growth_threshold * N
+                                 blocks; None keeps the tree size fixed.
         """
+        if overflow not in ('raise', 'evict'):
+            raise ValueError(f"Unsupported stash overflow policy '{overflow}'.")
+        if position_map not in ('dict', 'array', 'recursive'):
+            raise ValueError(f"Unsupported position map '{position_map}'.")
         self.N = N
         self.Z = Z
-        self.tree = self._init_tree()
-        self.position_map = {}
-        self.stash = []
+        self.L = (N - 1).bit_length()  # Tree height
+        self.num_leaves = 1 << self.L
+        self.growth_threshold = growth_threshold
+        self.growth_key = os.urandom(16)  # Keys the leaf bits added to blocks placed before a growth
+        self.num_blocks = 0
+        self.growths = 0
+        self._init_tree()
+        self.position_map = self._init_position_map(position_map)
+        self.stash = Stash()
+        self.max_stash_size = max_stash_size
+        self.overflow = overflow
+        self.peak_stash_size = 0
+        self.background_evictions = 0
+        self.buckets_read = 0
+        self.buckets_written = 0
 
     def _init_tree(self):
         """Initialize the ORAM tree."""
-        L = (self.N - 1).bit_length()  # Tree height
-        return {i: [] for i in range(2 ** (L + 1) - 1)}
+        self.tree = {i: [] for i in range(2 * self.num_leaves - 1)}
+
+    def _init_position_map(self, kind):
+        """Create the position map for this ORAM."""
+        if kind == 'dict':
+            return DictPositionMap()
+        if kind == 'array':
+            return ArrayPositionMap(self.N)
+        num_blocks = -(-self.N // ENTRIES_PER_BLOCK)
+        inner_kind = 'recursive' if num_blocks > RECURSION_CUTOFF else 'array'
+        return RecursivePositionMap(PathORAM(N=num_blocks, Z=self.Z, position_map=inner_kind,
+                                             growth_threshold=self.growth_threshold))
+
+    def _grow_tree(self, old_num_nodes):
+        """Add empty buckets for the nodes from old_num_nodes up to the new leaf level."""
+        for node in range(old_num_nodes, 2 * self.num_leaves - 1):
+            self.tree[node] = []
+
+    def _read_bucket(self, node):
+        """Remove and return the blocks stored in a bucket as (block ID, tag, data) tuples."""
+        blocks = self.tree[node]
+        self.tree[node] = []
+        return blocks
+
+    def _write_bucket(self, node, blocks):
+        """Store at most Z (block ID, tag, data) tuples in an empty bucket."""
+        self.tree[node] = blocks
 
     def access(self, op, a, data=None):
         """
-        Perform a read or write operation on block 'a'.
-        :param op: The operation to perform ('read' or 'write').
-        :param a: The block ID to access.
-        :param data: The data to write (only for 'write' operations).
-        :return: The data read (for 'read' operations), or None (for 'write' operations).
+        Perform a read, write or update operation on block 'a'.
+        :param op: The operation to perform ('read', 'write' or 'update'), 'modify' to update a block
+                   only if it exists, or 'dummy' to read and evict a random path without touching any
+                   block, indistinguishable from a real access.
+        :param a: The block ID to access (ignored for 'dummy').
+        :param data: The data to write for 'write' operations, or for 'update' and 'modify' operations
+                     a function mapping the current data (None if absent, for 'update') to the new data.
+        :return: The data read (for 'read' operations, None for a block that was never written, whose
+                 read touches a random path and maps nothing), the data before the update (for
+                 'update' and 'modify' operations; 'modify' leaves a missing block missing and returns
+                 None), or None (for 'write' and 'dummy' operations).
         """
-        if a not in self.position_map:
-            # Assign a random leaf for the block if it doesn't exist
-            self.position_map[a] = random.randint(0, 2 ** (self.N - 1).bit_length() - 1)
+        return self.access_many([(op, a, data)])[0]
 
-        x = self.position_map[a]
-        # Update the position map to a new random leaf
-        self.position_map[a] = random.randint(0, 2 ** (self.N - 1).bit_length() - 1)
-        path = self.get_path(x)
+    def access_many(self, ops):
+        """
+        Perform a batch of operations with a single read and a single eviction over the union of their paths.
+        :param ops: Sequence of (op, a, data) tuples as for access(), applied in order; data is ignored for reads.
+        :return: List with the result of each operation, as returned by access().
+        """
+        for op, a, _ in ops:
+            if op not in ('read', 'write', 'update', 'modify', 'dummy'):
+                raise ValueError(f"Unsupported ORAM operation '{op}'.")
+            if op in ('write', 'update'):
+                self.position_map.check(a)  # Reject unmappable IDs before any block is remapped
+        if not ops:
+            return []
+        metrics = self.metrics
+        if metrics.enabled:
+            start_time = time.perf_counter()
+            buckets_read, buckets_written = self.buckets_read, self.buckets_written
 
-        # Read and clear the path
-        for node in path:
-            self.stash.extend(self.tree[node])
-            self.tree[node] = []
+        # Look up the current leaf of every distinct block and remap it to a new random leaf
+        new_leaves = {}
+        leaves = set()
+        looked_up = set()
+        created = {a for op, a, _ in ops if op in ('write', 'update')}
+        for op, a, _ in ops:
+            if op == 'dummy':
+                leaves.add(random.randrange(self.num_leaves))
+                if isinstance(self.position_map, RecursivePositionMap):
+                    self.position_map.oram.access('dummy', None)  # Match a real lookup's position-ORAM access
+            elif a not in looked_up:
+                # One position-map access per distinct block; only blocks written in the batch are created
+                looked_up.add(a)
+                create = a in created
+                new_leaf = random.randrange(self.num_leaves)
+                x = self.position_map.remap(a, new_leaf + self.num_leaves, create)
+                if x is None:
+                    # Never written: read a random path
+                    leaves.add(random.randrange(self.num_leaves))
+                    if create:
+                        new_leaves[a] = new_leaf
+                        self.num_blocks += 1
+                else:
+                    new_leaves[a] = new_leaf
+                    leaves.add(self._resolve(a, x))
+
+        if self.trace is not None:
+            self.trace.append(tuple(sorted(leaves)))
 
-        # Handle the operation
-        block = next((b for b in self.stash if b[0] == a), None)
-        if op == 'write':
-            if block:
-                self.stash.remove(block)
-            self.stash.append((a, self.position_map[a], data))
-        elif op == 'read':
-            if block:
-                return block[2]  # Return data for read operation
+        # Read every distinct path once; shared upper levels are read only once
+        if len(leaves) == 1:
+            x = leaves.pop()
+            nodes = self.get_path(x)
+        else:
+            x = None
+            nodes = set()
+            for leaf in leaves:
+                nodes.update(self.get_path(leaf))
+        self._read_path(nodes)
+
+        # Serve every operation from the stash; accessed blocks move to their new leaves
+        results = []
+        for op, a, data in ops:
+            if op == 'dummy' or a not in new_leaves:  # Dummies and reads or modifies of missing blocks
+                results.append(None)
+                continue
+            new_leaf = new_leaves[a]
+            if op == 'write':
+                self.stash.add(a, new_leaf, data)
+                results.append(None)
+            elif op in ('update', 'modify'):
+                block = self.stash.get(a)
+                if block is None and op == 'modify':
+                    results.append(None)
+                    continue
+                old_data = block[1] if block is not None else None
+                self.stash.add(a, new_leaf, data(old_data))
+                results.append(old_data)
             else:
-                # If the block is not found, return None
-                return None
+                block = self.stash.get(a)
+                if block is not None:
+                    self.stash.add(a, new_leaf, block[1])
+                    results.append(block[1])
+                else:
+                    results.append(None)
 
-        # Write back blocks to the tree
-        for node in reversed(path):
-            bucket_blocks = [b for b in self.stash if self.get_path(b[1])[-1] == node]
-            self.stash = [b for b in self.stash if b not in bucket_blocks]
-            self.tree[node] = bucket_blocks[:self.Z]
+        if metrics.enabled:
+            evict_time = time.perf_counter()
+        if x is None:
+            self._evict_union(nodes)
+        else:
+            self._evict(x, nodes)
+        self._check_stash()
+        if self.growth_threshold is not None:
+            while self.num_blocks > self.growth_threshold * self.N:
+                self.grow()
 
-        return None  # For write operations
+        if metrics.enabled:
+            end_time = time.perf_counter()
+            metrics.observe("oram.access_seconds", end_time - start_time)
+            metrics.observe("oram.evict_seconds", end_time - evict_time)
+            metrics.observe("oram.batch_ops", len(ops))
+            metrics.observe("oram.nodes_read", self.buckets_read - buckets_read)
+            metrics.observe("oram.nodes_written", self.buckets_written - buckets_written)
+            metrics.observe("oram.stash_size", len(self.stash))
+        return results
+
+    def grow(self):
+        """
+        Double the capacity online by adding a new, empty leaf level below the tree.
+        Heap indices of existing nodes do not change, and the path to old leaf l is the
+        upper part of the paths to new leaves 2l and 2l+1, so no block has to move.
+        Positions are stored as tags (a leaf's 1-indexed heap position at the time it
+        was assigned, see _resolve); a tag from before the growth resolves to one of its
+        descendant leaves. Blocks move into the new level incrementally, as later
+        accesses remap them and evictions push them down.
+        """
+        old_num_leaves = self.num_leaves
+        self.N *= 2
+        self.L += 1
+        self.num_leaves *= 2
+        self._grow_tree(2 * old_num_leaves - 1)
+        for a, (leaf, data) in list(self.stash.blocks.items()):
+            self.stash.add(a, self._resolve(a, leaf + old_num_leaves), data)
+        self.growths += 1
+
+    def reserve(self, num_blocks):
+        """Grow ahead of time until num_blocks blocks fit under the growth threshold (no-op if growth is disabled)."""
+        if self.growth_threshold is None:
+            return
+        while num_blocks > self.growth_threshold * self.N:
+            self.grow()
+
+    def _resolve(self, a, tag):
+        """
+        Map a position tag to a leaf of the current tree.
+        A tag is the 1-indexed heap position of the leaf when it was assigned (leaf + num_leaves).
+        Tags from before a growth name an inner node; they are extended one level at a time
+        with bits of a keyed hash of the block ID, so the position map and the tree buckets
+        always resolve a block's tags to the same leaf.
+        """
+        depth = tag.bit_length() - 1
+        if depth < self.L:
+            bits = int.from_bytes(hashlib.blake2b(repr(a).encode('utf-8'), key=self.growth_key,
+                                                  digest_size=8).digest(), 'little')
+            for level in range(depth, self.L):
+                tag = (tag << 1) | ((bits >> level) & 1)
+        return tag - self.num_leaves
 
     def get_path(self, leaf):
-        """Get the path from the root to the specified leaf."""
-        path = []
-        node = leaf + (2 ** (self.N - 1).bit_length() - 1)
-        while node >= 0:
-            path.append(node)
-            node = (node - 1) // 2
-        return path
+        """Get the node indices from the root (index 0) down to the specified leaf."""
+        node = leaf + self.num_leaves  # 1-indexed heap position of the leaf
+        return [(node >> (self.L - level)) - 1 for level in range(self.L + 1)]
+
+    def stash_stats(self):
+        """Report current and peak stash occupancy (measured after eviction)."""
+        return {
+            "current": len(self.stash),
+            "peak": self.peak_stash_size,
+            "max": self.max_stash_size,
+            "background_evictions": self.background_evictions,
+            "blocks": self.num_blocks,
+            "capacity": self.N,
+            "growths": self.growths,
+        }
+
+    def enable_metrics(self, enabled=True):
+        """Start recording per-access metrics in a fresh Metrics hook, or switch back to the no-op hook."""
+        self.metrics = Metrics() if enabled else NULL_METRICS
+
+    def metrics_snapshot(self, reset=True):
+        """Return (and by default clear) the samples recorded by this ORAM's metrics hook."""
+        if not self.metrics.enabled:
+            return {"samples": {}, "counters": {}}
+        return self.metrics.snapshot(reset)
+
+    def enable_trace(self, enabled=True, position_map=False):
+        """
+        Start recording the leaves of the paths read by each access_many batch, or stop recording.
+        :param position_map: Also record the ORAMs of a recursive position map (stopping always stops them).
+        """
+        self.trace = [] if enabled else None
+        if isinstance(self.position_map, RecursivePositionMap) and (position_map or not enabled):
+            self.position_map.oram.enable_trace(enabled, position_map)
+
+    def drain_trace(self, position_map=False):
+        """
+        Return and clear the recorded trace: one tuple of leaves per batch, oldest first.
+        :param position_map: Return a list of traces instead, one per ORAM level, from this ORAM
+                             down through the ORAMs of a recursive position map.
+        """
+        if self.trace is None:
+            trace = []
+        else:
+            trace, self.trace = self.trace, []
+        if not position_map:
+            return trace
+        if isinstance(self.position_map, RecursivePositionMap):
+            return [trace] + self.position_map.oram.drain_trace(position_map)
+        return [trace]
+
+    def _read_path(self, nodes):
+        """Move every block on the given path (or union of paths) into the stash."""
+        for node in nodes:
+            for block_id, tag, data in self._read_bucket(node):
+                self.stash.add(block_id, self._resolve(block_id, tag), data)
+        self.buckets_read += len(nodes)
+
+    def _evict(self, x, path):
+        """
+        Greedily write stash blocks back along the path to leaf 'x' in one pass.
+        Blocks of leaf 'l' may live at any level up to the deepest common ancestor
+        of 'l' and 'x', which is L - bit_length(l ^ x). Only the leaf index is
+        scanned, so the cost does not grow with blocks that stay in the stash.
+        """
+        L, Z, num_leaves = self.L, self.Z, self.num_leaves
+        leaves_by_level = [[] for _ in range(L + 1)]
+        for leaf in self.stash.leaf_index:
+            leaves_by_level[L - (leaf ^ x).bit_length()].append(leaf)
+
+        # Fill buckets from the leaf upwards; leaves that do not fit move up a level
+        candidates = []
+        for level in range(L, -1, -1):
+            candidates.extend(leaves_by_level[level])
+            bucket = []
+            while candidates and len(bucket) < Z:
+                leaf = candidates[-1]
+                block_id, data = self.stash.pop_from_leaf(leaf)
+                bucket.append((block_id, leaf + num_leaves, data))
+                if leaf not in self.stash.leaf_index:
+                    candidates.pop()
+            self._write_bucket(path[level], bucket)
+        self.buckets_written += len(path)
+
+    def _evict_union(self, nodes):
+        """
+        Greedily write stash blocks back over a union of root-to-leaf paths in one pass.
+        Each leaf is assigned to the deepest union node on its own path; buckets are
+        filled children first (higher heap index first), and leftovers move to the parent.
+        """
+        num_leaves, Z = self.num_leaves, self.Z
+        leaves_at = {}
+        for leaf in self.stash.leaf_index:
+            node = leaf + num_leaves  # 1-indexed heap position of the leaf
+            while node - 1 not in nodes:
+                node >>= 1
+            leaves_at.setdefault(node - 1, []).append(leaf)
+
+        carried = {}
+        for node in sorted(nodes, reverse=True):
+            candidates = carried.pop(node, [])
+            candidates.extend(leaves_at.get(node, ()))
+            bucket = []
+            while candidates and len(bucket) < Z:
+                leaf = candidates[-1]
+                block_id, data = self.stash.pop_from_leaf(leaf)
+                bucket.append((block_id, leaf + num_leaves, data))
+                if leaf not in self.stash.leaf_index:
+                    candidates.pop()
+            self._write_bucket(node, bucket)
+            if node and candidates:
+                carried.setdefault((node - 1) // 2, []).extend(candidates)
+        self.buckets_written += len(nodes)
+
+    def _check_stash(self):
+        """Track the peak stash size and enforce max_stash_size."""
+        self.peak_stash_size = max(self.peak_stash_size, len(self.stash))
+        if self.max_stash_size is None or len(self.stash) <= self.max_stash_size:
+            return
+
+        if self.overflow == 'evict':
+            for _ in range(self.MAX_BACKGROUND_EVICTIONS):
+                leaf = random.randrange(self.num_leaves)
+                path = self.get_path(leaf)
+                self._read_path(path)
+                self._evict(leaf, path)
+                self.background_evictions += 1
+                if len(self.stash) <= self.max_stash_size:
+                    return
+
+        raise StashOverflowError(
+            f"Stash holds {len(self.stash)} blocks, above the maximum of {self.max_stash_size}."
+        )
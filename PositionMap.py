@@ -0,0 +1,145 @@
+from array import array
+
+UNMAPPED = 0xFFFFFFFF  # Sentinel leaf for block IDs without a position
+ENTRIES_PER_BLOCK = 32  # Positions packed into one block of a recursive position map
+RECURSION_CUTOFF = 1024  # Position ORAMs with at most this many blocks use an array map instead
+MAX_ARRAY_SPARSITY = 256  # Array maps hold IDs below this many times (mapped IDs + initial capacity)
+
+
+class DictPositionMap(dict):
+    """Position map backed by a Python dict of block ID -> leaf."""
+
+    def check(self, a):
+        """Any hashable block ID can be mapped."""
+
+    def remap(self, a, leaf, create=True):
+        """
+        Assign 'leaf' to block 'a' and return its previous leaf (None if unmapped).
+        With create=False an unmapped block is left unmapped.
+        """
+        old_leaf = self.get(a)
+        if old_leaf is not None or create:
+            self[a] = leaf
+        return old_leaf
+
+
+class ArrayPositionMap:
+    def __init__(self, capacity):
+        """
+        Compact position map: an array('I') of leaves indexed by block ID.
+        Uses 4 bytes per entry instead of a dict entry per block; grows when a larger ID is mapped.
+        IDs at or above MAX_ARRAY_SPARSITY * (mapped IDs + capacity) are rejected, so a stray
+        large ID cannot blow up the array.
+        :param capacity: Initial number of block IDs (0..capacity-1) to allocate.
+        """
+        self.capacity = max(capacity, 1)
+        self.leaves = array('I', [UNMAPPED]) * self.capacity
+        self.count = 0  # Mapped IDs
+
+    def __len__(self):
+        return self.count
+
+    def get(self, a, default=None):
+        if 0 <= a < len(self.leaves) and self.leaves[a] != UNMAPPED:
+            return self.leaves[a]
+        return default
+
+    def __getitem__(self, a):
+        leaf = self.get(a)
+        if leaf is None:
+            raise KeyError(a)
+        return leaf
+
+    def check(self, a):
+        """Raise ValueError if block 'a' cannot be mapped."""
+        if a < 0:
+            raise ValueError(f"Array position maps need non-negative block IDs, got {a}.")
+        if a >= MAX_ARRAY_SPARSITY * (self.count + self.capacity):
+            raise ValueError(f"Block ID {a} is too sparse for an array position map with {self.count} "
+                             f"mapped IDs; use the 'dict' position map for sparse IDs.")
+
+    def __setitem__(self, a, leaf):
+        self.check(a)
+        if a >= len(self.leaves):
+            new_size = min(max(a + 1, 2 * len(self.leaves)), MAX_ARRAY_SPARSITY * (self.count + self.capacity))
+            self.leaves.extend(array('I', [UNMAPPED]) * (new_size - len(self.leaves)))
+        if self.leaves[a] == UNMAPPED:
+            self.count += 1
+        self.leaves[a] = leaf
+
+    def remap(self, a, leaf, create=True):
+        """
+        Assign 'leaf' to block 'a' and return its previous leaf (None if unmapped).
+        With create=False an unmapped block is left unmapped.
+        """
+        old_leaf = self.get(a)
+        if old_leaf is not None or create:
+            self[a] = leaf
+        return old_leaf
+
+
+class RecursivePositionMap:
+    def __init__(self, oram, entries_per_block=ENTRIES_PER_BLOCK):
+        """
+        Position map stored in a smaller ORAM, as in the recursive construction of the Path ORAM paper.
+        Block b of the position ORAM packs the leaves of block IDs [b*k, (b+1)*k) as an array('I').
+        :param oram: PathORAM holding the packed position blocks (it may itself be recursive).
+        :param entries_per_block: Number of positions packed per block (k).
+        """
+        if entries_per_block < 1:
+            raise ValueError("entries_per_block must be at least 1.")
+        self.oram = oram
+        self.entries_per_block = entries_per_block
+
+    def _unpack(self, payload):
+        entries = array('I')
+        if payload is None:
+            return array('I', [UNMAPPED]) * self.entries_per_block
+        entries.frombytes(payload)
+        return entries
+
+    def get(self, a, default=None):
+        if a < 0:
+            return default
+        block, slot = divmod(a, self.entries_per_block)
+        leaf = self._unpack(self.oram.access('read', block))[slot]
+        return default if leaf == UNMAPPED else leaf
+
+    def __getitem__(self, a):
+        leaf = self.get(a)
+        if leaf is None:
+            raise KeyError(a)
+        return leaf
+
+    def __setitem__(self, a, leaf):
+        self.remap(a, leaf)
+
+    def check(self, a):
+        """Raise ValueError if block 'a' cannot be mapped."""
+        if a < 0:
+            raise ValueError(f"Recursive position maps need non-negative block IDs, got {a}.")
+
+    def remap(self, a, leaf, create=True):
+        """
+        Assign 'leaf' to block 'a' with one position-ORAM access and return its previous leaf.
+        With create=False an unmapped block is left unmapped, and a missing position block is not
+        created; the single access looks the same either way, so lookups of hits and misses match.
+        """
+        if create:
+            self.check(a)
+        elif a < 0:
+            self.oram.access('dummy', None)
+            return None
+        block, slot = divmod(a, self.entries_per_block)
+        old_leaf = UNMAPPED
+
+        def update(payload):
+            nonlocal old_leaf
+            entries = self._unpack(payload)
+            old_leaf = entries[slot]
+            if old_leaf != UNMAPPED or create:
+                entries[slot] = leaf
+            return entries.tobytes()
+
+        self.oram.access('update' if create else 'modify', block, update)
+        return None if old_leaf == UNMAPPED else old_leaf
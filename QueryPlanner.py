@@ -0,0 +1,92 @@
+PREDICATE_OPS = ("=", "and", "or")
+PROBE_RATIO = 8  # Probe candidates by ID when a predicate matches this many times more rows than there are candidates
+PROBE_CHUNK = 500  # Record IDs per IN (...) probe, below SQLite's parameter limit
+
+
+class QueryPlanner:
+    def __init__(self, conn, tokenize, column_for):
+        """
+        Resolve predicate trees to record IDs using the indexed token columns in SQLite.
+        A predicate is ("=", field, value), ("and", p1, p2, ...) or ("or", p1, p2, ...).
+        plan() estimates every equality's match count from its index; conjunctions then run
+        their most selective predicate first and only keep narrowing its candidate set, so
+        no ORAM access is needed until the final ID set is known.
+        :param conn: SQLite connection holding the records table.
+        :param tokenize: Function mapping a field value to its deterministic token.
+        :param column_for: Function mapping a searchable field name to its column (raises ValueError otherwise).
+        """
+        self.conn = conn
+        self.tokenize = tokenize
+        self.column_for = column_for
+
+    def plan(self, predicate):
+        """
+        Validate a predicate tree and annotate it with match-count estimates.
+        :return: Plan node dict with 'op' and 'estimate', plus 'field', 'value', 'column' and 'token'
+                 for equalities or 'children' (conjunctions sorted most selective first) otherwise.
+        """
+        if not isinstance(predicate, (tuple, list)) or not predicate or predicate[0] not in PREDICATE_OPS:
+            raise ValueError(f"Invalid predicate {predicate!r}; expected ('=', field, value), ('and', ...) or ('or', ...).")
+        op = predicate[0]
+        if op == "=":
+            if len(predicate) != 3:
+                raise ValueError(f"Equality predicates take a field and a value, got {predicate!r}.")
+            _, field, value = predicate
+            column = self.column_for(field)
+            token = self.tokenize(value if isinstance(value, str) else str(value))
+            (estimate,) = self.conn.execute(f"SELECT COUNT(*) FROM records WHERE {column} = ?", (token,)).fetchone()
+            return {"op": op, "field": field, "value": value, "column": column, "token": token, "estimate": estimate}
+
+        if len(predicate) < 2:
+            raise ValueError(f"'{op}' predicates need at least one operand.")
+        children = [self.plan(child) for child in predicate[1:]]
+        if op == "and":
+            children.sort(key=lambda child: child["estimate"])
+            estimate = children[0]["estimate"]
+        else:
+            estimate = sum(child["estimate"] for child in children)
+        return {"op": op, "children": children, "estimate": estimate}
+
+    def execute(self, plan, candidates=None):
+        """
+        Evaluate a plan from plan().
+        :param candidates: Dict of record ID -> ORAM ID to restrict the result to (None for all records).
+        :return: Dict of record ID -> ORAM ID of the matching records.
+        """
+        op = plan["op"]
+        if op == "and":
+            for child in plan["children"]:
+                candidates = self.execute(child, candidates)
+                if not candidates:
+                    break
+            return candidates
+        if op == "or":
+            matches = {}
+            for child in plan["children"]:
+                matches.update(self.execute(child, candidates))
+            return matches
+
+        sql = f"SELECT id, oram_id FROM records WHERE {plan['column']} = ?"
+        if candidates is not None and plan["estimate"] > PROBE_RATIO * len(candidates):
+            # Few candidates left: look them up by primary key instead of scanning the whole index range
+            matches = {}
+            record_ids = list(candidates)
+            for start in range(0, len(record_ids), PROBE_CHUNK):
+                chunk = record_ids[start:start + PROBE_CHUNK]
+                rows = self.conn.execute(f"{sql} AND id IN ({','.join('?' * len(chunk))})", (plan["token"], *chunk))
+                matches.update(rows)
+            return matches
+        matches = dict(self.conn.execute(sql, (plan["token"],)))
+        if candidates is not None:
+            matches = {record_id: oram_id for record_id, oram_id in matches.items() if record_id in candidates}
+        return matches
+
+
+def describe_plan(plan, indent=0):
+    """Render a plan as indented text, one predicate per line with its estimated match count."""
+    pad = "  " * indent
+    if plan["op"] == "=":
+        return f"{pad}{plan['field']} = {plan['value']!r} (est. {plan['estimate']})"
+    lines = [f"{pad}{plan['op'].upper()} (est. {plan['estimate']})"]
+    lines.extend(describe_plan(child, indent + 1) for child in plan["children"])
+    return "\n".join(lines)
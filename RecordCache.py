@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+CACHE_POLICIES = ('lru', 'lfu')
+
+
+class RecordCache:
+    def __init__(self, capacity, policy='lru'):
+        """
+        Size-bounded cache of decrypted records, kept on the trusted client.
+        'lru' evicts the least recently used record; 'lfu' evicts the least frequently
+        used one, breaking ties by least recent use. Both policies are O(1) per operation.
+        :param capacity: Maximum number of cached records.
+        :param policy: Eviction policy, 'lru' or 'lfu'.
+        """
+        if policy not in CACHE_POLICIES:
+            raise ValueError(f"Unsupported cache policy '{policy}'.")
+        if capacity < 1:
+            raise ValueError("Cache capacity must be at least 1.")
+        self.capacity = capacity
+        self.policy = policy
+        self.entries = OrderedDict()  # Key -> value (LRU order), or key -> (value, frequency) for LFU
+        self.frequencies = {}  # LFU: frequency -> OrderedDict of keys in recency order
+        self.min_frequency = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """Return the cached value for key (counting a hit), or None (counting a miss)."""
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.policy == 'lru':
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        value, frequency = self.entries[key]
+        self._touch(key, value, frequency)
+        return value
+
+    def put(self, key, value):
+        """Insert or replace a value, evicting another entry if the cache is full."""
+        if self.policy == 'lru':
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+            return
+
+        if key in self.entries:
+            self._touch(key, value, self.entries[key][1])
+            return
+        if len(self.entries) >= self.capacity:
+            victims = self.frequencies[self.min_frequency]
+            victim, _ = victims.popitem(last=False)
+            if not victims:
+                del self.frequencies[self.min_frequency]
+            del self.entries[victim]
+        self.entries[key] = (value, 1)
+        self.frequencies.setdefault(1, OrderedDict())[key] = None
+        self.min_frequency = 1
+
+    def invalidate(self, key):
+        """Drop key from the cache if present."""
+        if key not in self.entries:
+            return
+        if self.policy == 'lru':
+            del self.entries[key]
+            return
+        _, frequency = self.entries.pop(key)
+        keys = self.frequencies[frequency]
+        del keys[key]
+        if not keys:
+            del self.frequencies[frequency]
+            if self.min_frequency == frequency:
+                self.min_frequency = min(self.frequencies, default=0)
+
+    def _touch(self, key, value, frequency):
+        """LFU: store value and move key from its frequency list to the next one."""
+        keys = self.frequencies[frequency]
+        del keys[key]
+        if not keys:
+            del self.frequencies[frequency]
+            if self.min_frequency == frequency:
+                self.min_frequency = frequency + 1
+        self.entries[key] = (value, frequency + 1)
+        self.frequencies.setdefault(frequency + 1, OrderedDict())[key] = None
+
+    def stats(self):
+        """Report size, hits, misses and hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "policy": self.policy,
+            "capacity": self.capacity,
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,62 @@
+import struct
+import zlib
+from itertools import accumulate
+
+CODEC_VERSION = 1
+
+
+class RecordCodec:
+    def __init__(self, fields, record_size=1008):
+        """
+        Length-prefixed binary record format with a schema header.
+        Layout: version byte, 4-byte schema fingerprint, uint16 field count, one uint16 length
+        per field, the UTF-8 field values back to back, then zero padding up to record_size.
+        Every encoded record has the same size, so ORAM block payloads are fixed-size, and
+        decode() can slice out only the requested columns from the length table.
+        :param fields: Ordered field names of the schema.
+        :param record_size: Size in bytes of every encoded record.
+        """
+        self.fields = list(fields)
+        self.record_size = record_size
+        self.field_index = {field: i for i, field in enumerate(self.fields)}
+        fingerprint = zlib.crc32("\x1f".join(self.fields).encode('utf-8'))
+        self.header = struct.pack('<BIH', CODEC_VERSION, fingerprint, len(self.fields))
+        self.lengths = struct.Struct(f'<{len(self.fields)}H')
+        self.data_offset = len(self.header) + self.lengths.size
+
+    def encode(self, record):
+        """Encode a record dict (missing fields become empty strings) into record_size bytes."""
+        values = []
+        for field in self.fields:
+            value = record.get(field, "")
+            if not isinstance(value, str):
+                value = str(value)
+            values.append(value.encode('utf-8'))
+
+        size = self.data_offset + sum(len(value) for value in values)
+        if size > self.record_size:
+            raise ValueError(f"Encoded record needs {size} bytes, above record_size={self.record_size}.")
+        return b"".join([self.header, self.lengths.pack(*map(len, values)), *values,
+                         bytes(self.record_size - size)])
+
+    def decode(self, payload, fields=None):
+        """
+        Decode a record, or only the given fields of it.
+        :param payload: Bytes produced by encode().
+        :param fields: Field names to decode (None for all fields, in schema order).
+        :return: Dict of field name -> string value.
+        """
+        if payload[:len(self.header)] != self.header:
+            raise ValueError("Record was encoded with a different codec version or schema.")
+        # Field values follow the length table back to back
+        ends = list(accumulate(self.lengths.unpack_from(payload, len(self.header)), initial=self.data_offset))
+
+        if fields is None:
+            return {field: payload[ends[i]:ends[i + 1]].decode('utf-8') for i, field in enumerate(self.fields)}
+        result = {}
+        for field in fields:
+            i = self.field_index.get(field)
+            if i is None:
+                raise ValueError(f"Field '{field}' does not exist in the record schema.")
+            result[field] = payload[ends[i]:ends[i + 1]].decode('utf-8')
+        return result
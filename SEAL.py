@@ -1,38 +1,283 @@
 import os
+import json
+from datetime import date, datetime, time as datetime_time, timedelta
+import pickle
+import shutil
 import sqlite3
 import random
+import time
 from Crypto.Hash import SHA256
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
+from Crypto.Random import get_random_bytes
 from PathORAM import PathORAM
+from MmapPathORAM import MmapPathORAM
+from PartitionPool import make_partition_pool
 from EncryptionUtils import EncryptionUtils
+from RecordCodec import RecordCodec
+from Metrics import NULL_METRICS
+from QueryPlanner import QueryPlanner, describe_plan
+from RecordCache import RecordCache
+
+# Queryable CSV fields and their database columns, in CSV order
+FIELD_TO_COLUMN = {
+    "CB_NO": "cb_no",
+    "CASE NUMBER": "case_number",
+    "ARREST DATE": "arrest_date",
+    "RACE": "race",
+    "CHARGE 1 STATUTE": "charge_1_statute",
+    "CHARGE 1 DESCRIPTION": "charge_1_description",
+    "CHARGE 1 TYPE": "charge_1_type",
+    "CHARGE 1 CLASS": "charge_1_class",
+    "CHARGE 2 STATUTE": "charge_2_statute",
+    "CHARGE 2 DESCRIPTION": "charge_2_description",
+    "CHARGE 2 TYPE": "charge_2_type",
+    "CHARGE 2 CLASS": "charge_2_class",
+    "CHARGE 3 STATUTE": "charge_3_statute",
+    "CHARGE 3 DESCRIPTION": "charge_3_description",
+    "CHARGE 3 TYPE": "charge_3_type",
+    "CHARGE 3 CLASS": "charge_3_class",
+    "CHARGE 4 STATUTE": "charge_4_statute",
+    "CHARGE 4 DESCRIPTION": "charge_4_description",
+    "CHARGE 4 TYPE": "charge_4_type",
+    "CHARGE 4 CLASS": "charge_4_class",
+    "CHARGES STATUTE": "charges_statute",
+    "CHARGES DESCRIPTION": "charges_description",
+    "CHARGES TYPE": "charges_type",
+    "CHARGES CLASS": "charges_class",
+}
+
+# Fields stored as deterministic tokens (and indexed) unless SEAL is given its own list
+DEFAULT_SEARCHABLE_FIELDS = frozenset(FIELD_TO_COLUMN)
+
+# Range queries on ARREST DATE: each record also stores a deterministic token of its date bucket
+DATE_FIELD = "ARREST DATE"
+DATE_BUCKET_COLUMN = "arrest_date_bucket"
+DATE_FORMAT = "%m/%d/%Y %I:%M:%S %p"  # As in the arrests CSV
+DATE_GRANULARITIES = ('day', 'month', 'year')
+DATE_BUCKET_PREFIX = "date-bucket:"  # Keeps bucket tokens apart from tokens of other columns
+RANGE_QUERY_CHUNK = 500  # Bucket tokens per IN (...) lookup, below SQLite's parameter limit
+
+CHECKPOINT_FORMAT = 6
+CHECKPOINT_MANIFEST = "manifest.json"
+MEMORY_DB = ":memory:"  # SQLite target for a private in-memory database
+MIN_PARTITION_BLOCKS = 64  # Initial ORAM size when the record count is not known
+PARTITION_HEADROOM = 1.25  # Slack on each partition's expected share for uneven PRP assignment
+
+INSERT_SQL = "INSERT INTO records (id, {}, {}, oram_id) VALUES ({})".format(
+    ", ".join(FIELD_TO_COLUMN.values()), DATE_BUCKET_COLUMN, ", ".join("?" * (len(FIELD_TO_COLUMN) + 3))
+)
+BUMP_GENERATION_SQL = "UPDATE meta SET value = value + 1 WHERE key = 'generation'"
+
+def parse_date(value):
+    """Parse an ARREST DATE value (CSV format or ISO 8601); returns None if it is not a date."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime_time.min)
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def date_bucket(moment, granularity):
+    """Label of the day, month or year bucket holding a datetime, e.g. '2014-06-26', '2014-06' or '2014'."""
+    if granularity == 'day':
+        return f"{moment.year:04d}-{moment.month:02d}-{moment.day:02d}"
+    if granularity == 'month':
+        return f"{moment.year:04d}-{moment.month:02d}"
+    return f"{moment.year:04d}"
+
+def date_buckets_between(start, end, granularity):
+    """Labels of every bucket overlapping [start, end], in order."""
+    if granularity == 'day':
+        return [date_bucket(start + timedelta(days=i), 'day')
+                for i in range((end.date() - start.date()).days + 1)]
+    if granularity == 'month':
+        months = range(start.year * 12 + start.month - 1, end.year * 12 + end.month)
+        return [f"{month // 12:04d}-{month % 12 + 1:02d}" for month in months]
+    return [f"{year:04d}" for year in range(start.year, end.year + 1)]
+
+def encrypt_records(encryption, records, codec, searchable_fields=DEFAULT_SEARCHABLE_FIELDS, date_granularity=None):
+    """
+    Encrypt records into their ORAM payloads and their per-column metadata values.
+    Searchable fields get deterministic tokens, all others randomized encryption. The ORAM
+    payload is the codec's fixed-size binary encoding of the whole record, encrypted.
+    The whole batch costs one tokens_many and one encrypt_many call. Only needs an
+    EncryptionUtils instance, so it can also run in ingest worker processes.
+    :param date_granularity: 'day', 'month' or 'year' to add the token of each record's ARREST DATE
+                             bucket for range queries (None stores no bucket).
+    :return: List of (encrypted payload, tuple of column values in FIELD_TO_COLUMN order followed
+             by the date bucket token, empty if there is none).
+    """
+    token_values = []
+    plain_values = []
+    layouts = []  # Per record: payload position and, per column, (is token, position) or None
+    for record in records:
+        columns = []
+        for field in FIELD_TO_COLUMN:
+            if field not in record:
+                columns.append(None)
+                continue
+            value = record[field]
+            if not isinstance(value, str):
+                value = str(value)
+
+            if field in searchable_fields:
+                columns.append((True, len(token_values)))
+                token_values.append(value)
+            else:
+                columns.append((False, len(plain_values)))
+                plain_values.append(value.encode('utf-8'))
+        moment = parse_date(record.get(DATE_FIELD)) if date_granularity is not None else None
+        if moment is not None:
+            columns.append((True, len(token_values)))
+            token_values.append(DATE_BUCKET_PREFIX + date_bucket(moment, date_granularity))
+        else:
+            columns.append(None)
+        layouts.append((len(plain_values), columns))
+        plain_values.append(codec.encode(record))
+
+    tokens = encryption.tokens_many(token_values)
+    encrypted = encryption.encrypt_many(plain_values)
+
+    results = []
+    for payload, columns in layouts:
+        results.append((encrypted[payload], tuple(
+            "" if column is None else (tokens if column[0] else encrypted)[column[1]] for column in columns
+        )))
+    return results
 
 class SEAL:
-    def __init__(self, N=10, Z=4, alpha=2, x=2):
+    def __init__(self, N=None, Z=4, alpha=2, x=2, verbose=False, wal=False, searchable_fields=None,
+                 backend='serial', workers=None, position_map='dict', oram_dir=None, block_size=1024,
+                 record_size=1008, metrics=None, db_path='encrypted_db.sqlite', expected_records=None,
+                 growth_threshold=1.0, cache_size=0, cache_policy='lru', cache_constant_access=False,
+                 date_granularity=None):
         """
         Initialize the SEAL framework.
-        :param N: Maximum number of blocks per ORAM.
+        :param N: Initial number of blocks per ORAM (None sizes the partitions from expected_records).
         :param Z: Bucket capacity (number of blocks per bucket).
         :param alpha: Number of bits of leakage (2^alpha ORAMs).
         :param x: Padding factor (results are padded to the next power of x).
+        :param verbose: Print a line for every inserted record and query.
+        :param wal: Use SQLite write-ahead logging with synchronous=NORMAL for faster commits.
+        :param searchable_fields: Fields that query_by_field can search (defaults to every field).
+                                  They are stored as deterministic tokens in indexed columns.
+        :param backend: How per-partition ORAM batches run: 'serial', 'thread' (thread pool with a lock
+                        per partition) or 'process' (ORAM shards held in worker processes).
+        :param workers: Number of threads or processes for the parallel backends.
+        :param position_map: Position map of each ORAM: 'dict', 'array' or 'recursive' (see PathORAM).
+        :param oram_dir: Directory for memory-mapped ORAM tree files (None keeps the trees in memory).
+        :param block_size: Maximum encrypted record size in bytes for memory-mapped trees.
+        :param record_size: Size in bytes of every encoded record before encryption; the default
+                            makes each encrypted ORAM payload exactly 1024 bytes.
+        :param metrics: Metrics hook (see Metrics.py) that records crypto, SQLite, ORAM and padding
+                        costs, including every partition's accesses (None records nothing).
+        :param db_path: SQLite database file, replaced if it exists, or ':memory:' for a private
+                        in-memory database; use distinct targets to run several instances side by side.
+        :param expected_records: Expected total number of records, used to size the ORAMs when N is None.
+        :param growth_threshold: An ORAM doubles its tree online once it holds more than
+                                 growth_threshold * its capacity in blocks (None disables growth).
+        :param cache_size: Number of decrypted records cached on the client for retrieve_record(s)
+                           (0 disables the cache).
+        :param cache_policy: Cache eviction policy, 'lru' or 'lfu'.
+        :param cache_constant_access: On a cache hit, still run a dummy access on the record's ORAM
+                                      partition, so hits and misses look the same to the server.
+        :param date_granularity: 'day', 'month' or 'year' to enable range_query() on ARREST DATE with
+                                 indexed bucket tokens of that granularity (None disables it).
+                                 See range_query() for what the buckets leak.
         """
+        self.num_orams = 2 ** alpha
+        self.auto_size = N is None  # Only automatically sized partitions are grown ahead of inserts
+        if N is None:
+            N = self.partition_size(expected_records or 0)
         self.N = N
         self.Z = Z
         self.alpha = alpha
         self.x = x
-        self.num_orams = 2 ** alpha
-        self.orams = [PathORAM(N=N, Z=Z) for _ in range(self.num_orams)]  # Create multiple PathORAM objects
+        self.verbose = verbose
+        self.wal = wal
+        if searchable_fields is None:
+            searchable_fields = DEFAULT_SEARCHABLE_FIELDS
+        unknown = set(searchable_fields) - set(FIELD_TO_COLUMN)
+        if unknown:
+            raise ValueError(f"Fields {sorted(unknown)} do not exist in the database schema.")
+        self.searchable_fields = frozenset(searchable_fields)
+        if date_granularity is not None and date_granularity not in DATE_GRANULARITIES:
+            raise ValueError(f"Unsupported date granularity '{date_granularity}'.")
+        self.date_granularity = date_granularity
+        self.growth_threshold = growth_threshold
+        self.position_map = position_map
+        self.oram_dir = oram_dir
+        self.block_size = block_size
+        self.record_size = record_size
+        self.codec = RecordCodec(FIELD_TO_COLUMN, record_size)
+        self.cache_size = cache_size
+        self.cache_policy = cache_policy
+        self.cache_constant_access = cache_constant_access
+        self._init_cache()
+        if oram_dir is None:
+            orams = [PathORAM(N=N, Z=Z, position_map=position_map, growth_threshold=growth_threshold)
+                     for _ in range(self.num_orams)]  # Create multiple PathORAM objects
+        else:
+            os.makedirs(oram_dir, exist_ok=True)
+            orams = [MmapPathORAM(N=N, Z=Z, path=self._tree_path(i),
+                                  block_size=block_size, position_map=position_map,
+                                  growth_threshold=growth_threshold)
+                     for i in range(self.num_orams)]
+        self._start_partitions(orams, backend, workers)
+        self._set_metrics(metrics)
         self.encryption = EncryptionUtils()
+        self.db_file = db_path if db_path == MEMORY_DB else os.path.abspath(db_path)
         self.conn = self.init_db()
 
+    def partition_size(self, num_records):
+        """Blocks per ORAM partition for num_records records spread over the partitions by the PRP."""
+        return max(MIN_PARTITION_BLOCKS, int(num_records / self.num_orams * PARTITION_HEADROOM) + 1)
+
+    def _init_cache(self):
+        """Create the (empty) client-side record cache, if enabled."""
+        self.cache = RecordCache(self.cache_size, self.cache_policy) if self.cache_size else None
+
+    def _tree_path(self, oram_id):
+        """Absolute path of a partition's memory-mapped tree file in oram_dir."""
+        return os.path.abspath(os.path.join(self.oram_dir, f"oram_{oram_id}.bin"))
+
+    def _start_partitions(self, orams, backend, workers):
+        """Hand the ORAMs to the partition pool of the chosen backend."""
+        self.backend = backend
+        self.partitions = make_partition_pool(backend, orams, workers)
+        self.orams = None if backend == 'process' else orams  # Process workers own their ORAMs
+
+    def _set_metrics(self, metrics):
+        """Install the metrics hook and turn on per-access metrics in every partition if it records."""
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        if self.metrics.enabled:
+            self.partitions.call('enable_metrics')
+
     def init_db(self):
-        """Initialize the SQLite database."""
-        db_file = 'encrypted_db.sqlite'
-        if os.path.exists(db_file):
-            os.remove(db_file)
-            print(f"Deleted existing database file: {db_file}")
+        """Initialize an empty SQLite database, deleting any existing database file."""
+        if self.db_file != MEMORY_DB and os.path.exists(self.db_file):
+            os.remove(self.db_file)
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists(self.db_file + suffix):
+                    os.remove(self.db_file + suffix)
+            if self.verbose:
+                print(f"Deleted existing database file: {self.db_file}")
+        conn = self.connect_db()
+        self.next_record_id = 1
+        return conn
 
-        conn = sqlite3.connect(db_file)
+    def connect_db(self):
+        """
+        Connect to the SQLite database, creating the records table and token indexes if missing.
+        The meta table holds a write generation, bumped by every transaction that changes records,
+        so load() can tell whether the database moved on since a checkpoint.
+        """
+        conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS records (
@@ -61,192 +306,548 @@ class SEAL:
             charges_description BLOB,
             charges_type BLOB,
             charges_class BLOB,
+            arrest_date_bucket BLOB,
             oram_id INTEGER
         )
         """)
+        # Index every deterministic token column so equality lookups avoid a table scan
+        for field in self.searchable_fields:
+            column_name = FIELD_TO_COLUMN[field]
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_records_{column_name} ON records ({column_name})")
+        if self.date_granularity is not None:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_records_{DATE_BUCKET_COLUMN} ON records ({DATE_BUCKET_COLUMN})")
+        if self.wal:
+            # Write-ahead logging only needs an fsync at checkpoints instead of every commit
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
         conn.commit()
         return conn
 
     def deterministic_token(self, data):
         """Encrypt data deterministically for queryable fields."""
-        h = SHA256.new(data.encode('utf-8'))
-        cipher = AES.new(h.digest()[:16], AES.MODE_ECB)
-        return cipher.encrypt(pad(data.encode('utf-8'), AES.block_size))
+        return self.encryption.deterministic_token(data)
 
     def compute_oram_id(self, record_id):
         """Compute the ORAM ID for a given record ID using a PRP."""
         h = SHA256.new(str(record_id).encode('utf-8'))
         return int.from_bytes(h.digest(), byteorder='big') % self.num_orams
 
+    def store_encrypted_records(self, encrypted_records):
+        """
+        Assign IDs to encrypted records, insert their metadata and write them to their ORAMs.
+        The rows are inserted first and committed only once the ORAM writes succeed, so a failed
+        insert (e.g. a duplicate ID) writes no ORAM block and a failed ORAM write leaves no rows.
+        """
+        rows = []
+        by_oram = {}
+        for record_id, (encrypted_data, encrypted_fields) in enumerate(encrypted_records, self.next_record_id):
+            # Compute ORAM ID using a PRP
+            oram_id = self.compute_oram_id(record_id)
+            by_oram.setdefault(oram_id, []).append(('write', record_id, encrypted_data))
+            rows.append((record_id, *encrypted_fields, oram_id))
+
+        try:
+            # Insert metadata into SQLite database
+            with self.metrics.timer("seal.sqlite_write_seconds"):
+                self.conn.executemany(INSERT_SQL, rows)
+                self.conn.execute(BUMP_GENERATION_SQL)
+
+            # Insert the records into the appropriate Path ORAMs, one batched access per partition
+            with self.metrics.timer("seal.oram_write_seconds"):
+                self.partitions.run(by_oram)
+        except BaseException:
+            self.conn.rollback()
+            raise
+        with self.metrics.timer("seal.sqlite_write_seconds"):
+            self.conn.commit()
+        self.next_record_id += len(rows)
+        if self.verbose:
+            for oram_id, ops in by_oram.items():
+                for _, record_id, _ in ops:
+                    print(f"Record inserted with ID: {record_id} (ORAM {oram_id})")
+        self.metrics.count("seal.records_inserted", len(rows))
+
     def insert_record(self, record):
-        """Insert a record into the database and the appropriate Path ORAM."""
-        # Encrypt each field
-        encrypted_fields = {}
-        for field, value in record.items():
-            if not isinstance(value, str):
-                value = str(value)
+        """Insert a record into the database and the appropriate Path ORAM, and return its ID."""
+        return self.insert_records([record])[0]
 
-            if field == "RACE":
-                encrypted_fields[field] = self.deterministic_token(value)
-            else:
-                encrypted_fields[field] = self.encryption.encrypt_data(value)
+    def insert_records(self, records, batch_size=1000):
+        """
+        Insert records in batches, committing each batch as one SQLite transaction.
+        If records has a length, N was sized automatically and growth is enabled, the ORAM
+        partitions are grown for all of them before the first batch.
+        :param records: Iterable of records (dicts keyed by CSV field name).
+        :param batch_size: Number of records encrypted and committed together.
+        :return: The range of IDs assigned to the inserted records.
+        """
+        first_id = self.next_record_id
+        if self.auto_size and self.growth_threshold is not None and hasattr(records, '__len__'):
+            # Size the trees for the whole insert up front instead of growing them batch by batch
+            self.partitions.call('reserve', self.partition_size(first_id - 1 + len(records)))
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                self.store_encrypted_records(self._encrypt_records(batch))
+                batch = []
+        if batch:
+            self.store_encrypted_records(self._encrypt_records(batch))
+        return range(first_id, self.next_record_id)
 
-        # Encrypt the data (combine all fields into a single string)
-        data = ",".join(str(value) for value in record.values())
-        encrypted_data = self.encryption.encrypt_data(data)
+    def _encrypt_records(self, records):
+        """Encrypt a batch of records with this instance's key, codec and searchable fields."""
+        with self.metrics.timer("seal.encrypt_seconds"):
+            return encrypt_records(self.encryption, records, self.codec, self.searchable_fields,
+                                   self.date_granularity)
 
-        cursor = self.conn.cursor()
+    def _decode_records(self, encrypted_values, fields=None):
+        """Decrypt ORAM payloads in one batch and decode the records, or only the given fields of them."""
+        with self.metrics.timer("seal.decrypt_seconds"):
+            return [self.codec.decode(payload, fields) for payload in self.encryption.decrypt_many(encrypted_values)]
 
-        # Get the next record ID
-        cursor.execute('SELECT COUNT(*) FROM records')
-        record_id = cursor.fetchone()[0] + 1  # Simulate auto-increment
+    def retrieve_record(self, record_id, fields=None):
+        """
+        Retrieve and decrypt a record by ID.
+        :param fields: Field names to decode (None for the whole record).
+        """
+        return self.retrieve_records([record_id], fields)[0]
 
-        # Compute ORAM ID using a PRP
-        oram_id = self.compute_oram_id(record_id)
+    def retrieve_records(self, record_ids, fields=None):
+        """
+        Retrieve and decrypt several records, with one batch per ORAM partition dispatched together.
+        Records in the client cache are served from it (with a dummy access in their place if
+        cache_constant_access is set); the others are read from the ORAMs and cached.
+        :param fields: Field names to decode (None for whole records).
+        :return: List of record dicts (None for missing records) in the order of record_ids.
+        """
+        cache = self.cache
+        found = {}
+        batches = {}
+        for record_id in record_ids:
+            # Compute ORAM ID using a PRP
+            oram_id = self.compute_oram_id(record_id)
+            if cache is not None:
+                record = cache.get(record_id)
+                if record is not None:
+                    self.metrics.count("seal.cache_hits")
+                    found[record_id] = record
+                    if self.cache_constant_access:
+                        batches.setdefault(oram_id, []).append(('dummy', None, None))
+                    continue
+                self.metrics.count("seal.cache_misses")
+            batches.setdefault(oram_id, []).append(('read', record_id, None))
 
-        # Insert the record into the appropriate Path ORAM
-        self.orams[oram_id].access(op='write', a=record_id, data=encrypted_data)
-
-        # Insert metadata into SQLite database
-        cursor.execute('''
-            INSERT INTO records (
-                id, cb_no, case_number, arrest_date, race,
-                charge_1_statute, charge_1_description, charge_1_type, charge_1_class,
-                charge_2_statute, charge_2_description, charge_2_type, charge_2_class,
-                charge_3_statute, charge_3_description, charge_3_type, charge_3_class,
-                charge_4_statute, charge_4_description, charge_4_type, charge_4_class,
-                charges_statute, charges_description, charges_type, charges_class,
-                oram_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            record_id,
-            encrypted_fields.get("CB_NO", ""),
-            encrypted_fields.get("CASE NUMBER", ""),
-            encrypted_fields.get("ARREST DATE", ""),
-            encrypted_fields.get("RACE", ""),
-            encrypted_fields.get("CHARGE 1 STATUTE", ""),
-            encrypted_fields.get("CHARGE 1 DESCRIPTION", ""),
-            encrypted_fields.get("CHARGE 1 TYPE", ""),
-            encrypted_fields.get("CHARGE 1 CLASS", ""),
-            encrypted_fields.get("CHARGE 2 STATUTE", ""),
-            encrypted_fields.get("CHARGE 2 DESCRIPTION", ""),
-            encrypted_fields.get("CHARGE 2 TYPE", ""),
-            encrypted_fields.get("CHARGE 2 CLASS", ""),
-            encrypted_fields.get("CHARGE 3 STATUTE", ""),
-            encrypted_fields.get("CHARGE 3 DESCRIPTION", ""),
-            encrypted_fields.get("CHARGE 3 TYPE", ""),
-            encrypted_fields.get("CHARGE 3 CLASS", ""),
-            encrypted_fields.get("CHARGE 4 STATUTE", ""),
-            encrypted_fields.get("CHARGE 4 DESCRIPTION", ""),
-            encrypted_fields.get("CHARGE 4 TYPE", ""),
-            encrypted_fields.get("CHARGE 4 CLASS", ""),
-            encrypted_fields.get("CHARGES STATUTE", ""),
-            encrypted_fields.get("CHARGES DESCRIPTION", ""),
-            encrypted_fields.get("CHARGES TYPE", ""),
-            encrypted_fields.get("CHARGES CLASS", ""),
-            oram_id
-        ))
-        self.conn.commit()
-        print(f"Record inserted with ID: {record_id} (ORAM {oram_id})")
+        found_ids = []
+        found_data = []
+        with self.metrics.timer("seal.oram_read_seconds"):
+            partition_results = self.partitions.run(batches)
+        for oram_id, results in partition_results.items():
+            for (op, record_id, _), encrypted_data in zip(batches[oram_id], results):
+                if op == 'read' and encrypted_data is not None:
+                    found_ids.append(record_id)
+                    found_data.append(encrypted_data)
+
+        if cache is None:
+            found.update(zip(found_ids, self._decode_records(found_data, fields)))
+            return [found.get(record_id) for record_id in record_ids]
+
+        # The cache holds whole records; projections are taken from them
+        for record_id, record in zip(found_ids, self._decode_records(found_data)):
+            cache.put(record_id, record)
+            found[record_id] = record
+        return [self._project(found[record_id], fields) if record_id in found else None
+                for record_id in record_ids]
 
-    def retrieve_record(self, record_id):
-        """Retrieve and decrypt a record by ID."""
-        # Compute ORAM ID using a PRP
+    def _project(self, record, fields):
+        """Copy a decoded record, keeping only the given fields (all fields if None)."""
+        if fields is None:
+            return dict(record)
+        for field in fields:
+            if field not in record:
+                raise ValueError(f"Field '{field}' does not exist in the record schema.")
+        return {field: record[field] for field in fields}
+
+    def update_record(self, record_id, record):
+        """
+        Replace an existing record in its ORAM and its searchable metadata in SQLite.
+        The metadata update is committed only once the ORAM write succeeds. The client cache
+        is written through, so later reads see the new record.
+        """
+        if not 1 <= record_id < self.next_record_id:
+            raise ValueError(f"Record {record_id} does not exist.")
+        if self.cache is not None:
+            self.cache.invalidate(record_id)  # A failed update must not leave the old record cached
+        encrypted_data, encrypted_fields = self._encrypt_records([record])[0]
         oram_id = self.compute_oram_id(record_id)
 
-        # Retrieve the record from the appropriate Path ORAM
-        encrypted_data = self.orams[oram_id].access(op='read', a=record_id)
-        if encrypted_data is not None:
-            decrypted_data = self.encryption.decrypt_data(encrypted_data)
-            # Split the decrypted data into individual fields
-            fields = decrypted_data.split(',')
-            return {
-                "CB_NO": fields[0],
-                "CASE NUMBER": fields[1],
-                "ARREST DATE": fields[2],
-                "RACE": fields[3],
-                "CHARGE 1 STATUTE": fields[4],
-                "CHARGE 1 DESCRIPTION": fields[5],
-                "CHARGE 1 TYPE": fields[6],
-                "CHARGE 1 CLASS": fields[7],
-                "CHARGE 2 STATUTE": fields[8],
-                "CHARGE 2 DESCRIPTION": fields[9],
-                "CHARGE 2 TYPE": fields[10],
-                "CHARGE 2 CLASS": fields[11],
-                "CHARGE 3 STATUTE": fields[12],
-                "CHARGE 3 DESCRIPTION": fields[13],
-                "CHARGE 3 TYPE": fields[14],
-                "CHARGE 3 CLASS": fields[15],
-                "CHARGE 4 STATUTE": fields[16],
-                "CHARGE 4 DESCRIPTION": fields[17],
-                "CHARGE 4 TYPE": fields[18],
-                "CHARGE 4 CLASS": fields[19],
-                "CHARGES STATUTE": fields[20],
-                "CHARGES DESCRIPTION": fields[21],
-                "CHARGES TYPE": fields[22],
-                "CHARGES CLASS": fields[23],
-            }
-        return None
+        assignments = ", ".join(f"{column_name} = ?" for column_name in (*FIELD_TO_COLUMN.values(), DATE_BUCKET_COLUMN))
+        with self.conn:
+            with self.metrics.timer("seal.sqlite_write_seconds"):
+                self.conn.execute(f"UPDATE records SET {assignments} WHERE id = ?", (*encrypted_fields, record_id))
+                self.conn.execute(BUMP_GENERATION_SQL)
+            with self.metrics.timer("seal.oram_write_seconds"):
+                self.partitions.access_many(oram_id, [('write', record_id, encrypted_data)])
+        if self.cache is not None:
+            # Cache the record as a retrieval would return it (every field as a string)
+            self.cache.put(record_id, self.codec.decode(self.codec.encode(record)))
+
+    def cache_stats(self):
+        """Report the client cache's size, hits, misses and hit rate (None if the cache is disabled)."""
+        if self.cache is None:
+            return None
+        return {**self.cache.stats(), "constant_access": self.cache_constant_access}
+
+    def query_by_field(self, field_name, field_value, fields=None):
+        """
+        Query records by a specific field and return padded results.
+        :param fields: Field names to decode for each match (None for whole records).
+        :return: Matching record dicts, padded with 'dummy' entries to the next power of x.
+        """
+        metrics = self.metrics
+        if metrics.enabled:
+            start_time = time.perf_counter()
+
+        batches = self.match_batches(field_name, field_value)
 
-    def query_by_field(self, field_name, field_value):
-        """Query records by a specific field and return padded results."""
+        # Each partition serves its share of the matches in one batched access
+        with metrics.timer("seal.oram_read_seconds"):
+            partition_results = self.partitions.run(batches)
+        padded_records = self.finish_query(partition_results, fields)
+        if metrics.enabled:
+            metrics.observe("seal.query_seconds", time.perf_counter() - start_time)
+        if self.verbose:
+            print(f"Query results for '{field_name} = {field_value}': {padded_records}")
+
+        # Return the padded results
+        return padded_records
+
+    def match_batches(self, field_name, field_value, conn=None):
+        """
+        Look up the records whose field equals a value and group their reads by ORAM partition.
+        :param conn: SQLite connection for the lookup (defaults to this instance's connection).
+        :return: Dict of ORAM ID -> list of ('read', record ID, None) operations.
+        """
         # Encrypt the field value
         encrypted_field_value = self.deterministic_token(field_value)
 
-        # Map the field name to the corresponding database column
-        field_to_column = {
-            "RACE": "race",
-            "CB_NO": "cb_no",
-            "CASE NUMBER": "case_number",
-            "ARREST DATE": "arrest_date",
-            "CHARGE 1 STATUTE": "charge_1_statute",
-            "CHARGE 1 DESCRIPTION": "charge_1_description",
-            "CHARGE 1 TYPE": "charge_1_type",
-            "CHARGE 1 CLASS": "charge_1_class",
-            "CHARGE 2 STATUTE": "charge_2_statute",
-            "CHARGE 2 DESCRIPTION": "charge_2_description",
-            "CHARGE 2 TYPE": "charge_2_type",
-            "CHARGE 2 CLASS": "charge_2_class",
-            "CHARGE 3 STATUTE": "charge_3_statute",
-            "CHARGE 3 DESCRIPTION": "charge_3_description",
-            "CHARGE 3 TYPE": "charge_3_type",
-            "CHARGE 3 CLASS": "charge_3_class",
-            "CHARGE 4 STATUTE": "charge_4_statute",
-            "CHARGE 4 DESCRIPTION": "charge_4_description",
-            "CHARGE 4 TYPE": "charge_4_type",
-            "CHARGE 4 CLASS": "charge_4_class",
-            "CHARGES STATUTE": "charges_statute",
-            "CHARGES DESCRIPTION": "charges_description",
-            "CHARGES TYPE": "charges_type",
-            "CHARGES CLASS": "charges_class",
-        }
-
         # Get the corresponding column name
-        column_name = field_to_column.get(field_name.upper())
+        column_name = self._column_for(field_name)
+
+        cursor = (conn or self.conn).cursor()
+
+        # Retrieve all records with the matching field
+        with self.metrics.timer("seal.sqlite_query_seconds"):
+            cursor.execute(f'SELECT id, oram_id FROM records WHERE {column_name} = ?', (encrypted_field_value,))
+            results = cursor.fetchall()
+
+        batches = {}
+        for record_id, oram_id in results:
+            batches.setdefault(oram_id, []).append(('read', record_id, None))
+        return batches
+
+    def _column_for(self, field_name):
+        """Return the token column of a searchable field."""
+        column_name = FIELD_TO_COLUMN.get(field_name.upper())
         if not column_name:
             raise ValueError(f"Field '{field_name}' does not exist in the database schema.")
+        if field_name.upper() not in self.searchable_fields:
+            raise ValueError(f"Field '{field_name}' is not searchable in this SEAL instance.")
+        return column_name
 
-        cursor = self.conn.cursor()
+    def query(self, predicate, fields=None, conn=None):
+        """
+        Query records matching a predicate tree, e.g.
+        ("and", ("=", "RACE", "BLACK"), ("or", ("=", "CHARGE 1 CLASS", "X"), ("=", "CHARGE 1 CLASS", "4"))).
+        The matching IDs are resolved from the token indexes first, most selective predicate
+        first, so only the final records are read through the ORAMs and padded once.
+        :param predicate: ("=", field, value), ("and", p1, p2, ...) or ("or", p1, p2, ...).
+        :param fields: Field names to decode for each match (None for whole records).
+        :param conn: SQLite connection for the lookups (defaults to this instance's connection).
+        :return: Matching record dicts, padded with 'dummy' entries to the next power of x.
+        """
+        metrics = self.metrics
+        if metrics.enabled:
+            start_time = time.perf_counter()
 
-        # Retrieve all records with the matching field
-        cursor.execute(f'SELECT id, oram_id FROM records WHERE {column_name} = ?', (encrypted_field_value,))
-        results = cursor.fetchall()
+        planner = QueryPlanner(conn or self.conn, self.deterministic_token, self._column_for)
+        with metrics.timer("seal.sqlite_query_seconds"):
+            matches = planner.execute(planner.plan(predicate))
+
+        batches = {}
+        for record_id in sorted(matches):
+            batches.setdefault(matches[record_id], []).append(('read', record_id, None))
+        with metrics.timer("seal.oram_read_seconds"):
+            partition_results = self.partitions.run(batches)
+        padded_records = self.finish_query(partition_results, fields)
+        if metrics.enabled:
+            metrics.observe("seal.query_seconds", time.perf_counter() - start_time)
+        if self.verbose:
+            print(f"Query results for {predicate!r}: {padded_records}")
+        return padded_records
+
+    def range_query(self, start, end, fields=None, conn=None):
+        """
+        Query records whose ARREST DATE lies in [start, end] and return padded results.
+        Every date bucket (day, month or year, per date_granularity) overlapping the range is
+        looked up by its token in the bucket index, the matching records are read through
+        the ORAMs in one batch per partition, and the client drops the records of the edge
+        buckets that fall outside the range before padding.
 
-        # Collect all matching records
+        Leakage, beyond that of query_by_field: the server sees which records share a date
+        bucket (equality at bucket granularity, so frequency analysis over buckets is possible),
+        which buckets each query covers, and hence the range's width in buckets; the number
+        of ORAM reads reveals the total size of those buckets, including the edge records that
+        are filtered out. Only the final result count is hidden by padding. Coarser buckets
+        leak less but read more records outside the range.
+        :param start: First date or datetime (a date, datetime or ISO 8601 string); dates start at midnight.
+        :param end: Last date or datetime, inclusive; dates include the whole day.
+        :param fields: Field names to decode for each match (None for whole records).
+        :param conn: SQLite connection for the lookups (defaults to this instance's connection).
+        :return: Matching record dicts, padded with 'dummy' entries to the next power of x.
+        """
+        if self.date_granularity is None:
+            raise ValueError("Range queries need a SEAL instance created with date_granularity.")
+        is_date_only = isinstance(end, date) and not isinstance(end, datetime) or (
+            isinstance(end, str) and len(end) == 10)
+        start, end = parse_date(start), parse_date(end)
+        if start is None or end is None:
+            raise ValueError("Range bounds must be dates, datetimes or ISO 8601 strings.")
+        if is_date_only:
+            end = datetime.combine(end.date(), datetime_time.max)
+        if start > end:
+            raise ValueError("The start of the range is after its end.")
+        metrics = self.metrics
+        if metrics.enabled:
+            start_time = time.perf_counter()
+
+        buckets = date_buckets_between(start, end, self.date_granularity)
+        tokens = self.encryption.tokens_many([DATE_BUCKET_PREFIX + bucket for bucket in buckets])
+        batches = {}
+        with metrics.timer("seal.sqlite_query_seconds"):
+            for chunk_start in range(0, len(tokens), RANGE_QUERY_CHUNK):
+                chunk = tokens[chunk_start:chunk_start + RANGE_QUERY_CHUNK]
+                rows = (conn or self.conn).execute(
+                    f"SELECT id, oram_id FROM records WHERE {DATE_BUCKET_COLUMN} IN ({','.join('?' * len(chunk))})",
+                    chunk)
+                for record_id, oram_id in rows:
+                    batches.setdefault(oram_id, []).append(('read', record_id, None))
+
+        with metrics.timer("seal.oram_read_seconds"):
+            partition_results = self.partitions.run(batches)
+        found_data = [encrypted_data for oram_id in sorted(partition_results)
+                      for encrypted_data in partition_results[oram_id]
+                      if encrypted_data is not None]
+        decode_fields = None if fields is None else list(dict.fromkeys([*fields, DATE_FIELD]))
         all_records = []
-        for record_id, oram_id in results:
-            encrypted_data = self.orams[oram_id].access(op='read', a=record_id)
-            if encrypted_data is not None:  # Only process if data is found
-                decrypted_data = self.encryption.decrypt_data(encrypted_data)
-                all_records.append(decrypted_data)
+        for record in self._decode_records(found_data, decode_fields):
+            moment = parse_date(record[DATE_FIELD])
+            if moment is not None and start <= moment <= end:
+                all_records.append(record if fields is None or DATE_FIELD in fields
+                                   else {field: record[field] for field in fields})
 
-        # Pad the total number of results
         padded_records = self.pad_results(all_records)
-        print(f"Query results for '{field_name} = {field_value}': {padded_records}")
+        if metrics.enabled:
+            metrics.observe("seal.range_buckets", len(buckets))
+            metrics.observe("seal.range_edge_records", len(found_data) - len(all_records))
+            metrics.observe("seal.padding_records", len(padded_records) - len(all_records))
+            metrics.observe("seal.query_results", len(all_records))
+            metrics.observe("seal.query_seconds", time.perf_counter() - start_time)
+        if self.verbose:
+            print(f"Range query results for {start} - {end}: {padded_records}")
+        return padded_records
 
-        # Return the padded results
+    def explain(self, predicate):
+        """Return the plan query() would run for a predicate, with estimated match counts, as text."""
+        return describe_plan(QueryPlanner(self.conn, self.deterministic_token, self._column_for).plan(predicate))
+
+    def finish_query(self, partition_results, fields=None):
+        """
+        Decode the records read for a query and pad them.
+        :param partition_results: Dict of ORAM ID -> read results for the batches from match_batches().
+        :param fields: Field names to decode for each match (None for whole records).
+        :return: Matching record dicts, merged in ORAM ID order and padded to the next power of x.
+        """
+        found_data = [encrypted_data for oram_id in sorted(partition_results)
+                      for encrypted_data in partition_results[oram_id]
+                      if encrypted_data is not None]  # Only process if data is found
+        all_records = self._decode_records(found_data, fields)
+
+        # Pad the total number of results
+        padded_records = self.pad_results(all_records)
+        if self.metrics.enabled:
+            self.metrics.observe("seal.padding_records", len(padded_records) - len(all_records))
+            self.metrics.observe("seal.query_results", len(all_records))
         return padded_records
 
+    def stash_stats(self):
+        """Report current and peak stash size for every ORAM partition."""
+        return self.partitions.call('stash_stats')
+
+    def export_metrics(self, path):
+        """
+        Collect the partitions' access metrics into the metrics hook and export everything to JSON,
+        with the process RSS and this instance's configuration.
+        :param path: Output JSON file.
+        :return: The exported dict.
+        """
+        if not self.metrics.enabled:
+            raise ValueError("Metrics are disabled; pass a Metrics instance to SEAL.")
+        for snapshot in self.partitions.call('metrics_snapshot'):
+            self.metrics.merge(snapshot)
+        return self.metrics.export_json(path, extra={"config": {
+            "N": self.N, "Z": self.Z, "alpha": self.alpha, "x": self.x, "backend": self.backend,
+            "position_map": self.position_map, "oram_dir": self.oram_dir,
+        }})
+
+    def save(self, path, master_key):
+        """
+        Checkpoint the client state to a directory so SEAL can restart without re-ingesting.
+        The record key is wrapped under a key derived from master_key; every partition's ORAM
+        state (tree, stash and position map) goes to its own AES-GCM encrypted file, so load()
+        reads and restores partitions one at a time. Memory-mapped tree files are copied into
+        the checkpoint too (their buckets are already encrypted), since the live files keep
+        changing. Partition and tree files are named after the checkpoint's salt and the
+        manifest is replaced last, so until it is, the directory still holds the previous
+        complete checkpoint. The SQLite database stays where it is and is referenced by path;
+        the manifest records its write generation so load() can refuse a database that has
+        changed since.
+        :param path: Checkpoint directory (created if needed).
+        :param master_key: User-supplied master key (str or bytes).
+        """
+        if self.db_file == MEMORY_DB:
+            raise ValueError("An in-memory database cannot be checkpointed; use a database file.")
+        os.makedirs(path, exist_ok=True)
+        salt = get_random_bytes(16)
+        kek = EncryptionUtils.derive_key(master_key, salt)
+
+        self.conn.commit()
+        (generation,) = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        partition_files = []
+        for oram_id, state in enumerate(self.partitions.dump()):
+            partition_files.append(f"partition_{oram_id}_{salt.hex()}.bin")
+            self._write_file(os.path.join(path, partition_files[-1]), EncryptionUtils.encrypt_blob(kek, state))
+        # dump() flushed the memory-mapped trees, so their files match the partition states
+        tree_files = []
+        if self.oram_dir is not None:
+            for oram_id in range(self.num_orams):
+                tree_files.append(f"tree_{oram_id}_{salt.hex()}.bin")
+                self._copy_file(self._tree_path(oram_id), os.path.join(path, tree_files[-1]))
+
+        manifest = {
+            "format": CHECKPOINT_FORMAT,
+            "salt": salt.hex(),
+            "wrapped_key": EncryptionUtils.encrypt_blob(kek, self.encryption.key).hex(),
+            "next_record_id": self.next_record_id,
+            "generation": generation,
+            "partitions": partition_files,
+            "trees": tree_files,
+            "config": {
+                "N": self.N,
+                "auto_size": self.auto_size,
+                "Z": self.Z,
+                "alpha": self.alpha,
+                "x": self.x,
+                "wal": self.wal,
+                "searchable_fields": sorted(self.searchable_fields),
+                "date_granularity": self.date_granularity,
+                "position_map": self.position_map,
+                "growth_threshold": self.growth_threshold,
+                "oram_dir": self.oram_dir and os.path.abspath(self.oram_dir),
+                "block_size": self.block_size,
+                "record_size": self.record_size,
+                "cache_size": self.cache_size,
+                "cache_policy": self.cache_policy,
+                "cache_constant_access": self.cache_constant_access,
+                "db_file": self.db_file,
+            },
+        }
+        # The manifest is written last, so an interrupted save leaves the previous checkpoint intact
+        self._write_file(os.path.join(path, CHECKPOINT_MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+        for name in os.listdir(path):
+            if name.startswith(("partition_", "tree_")) and name not in partition_files + tree_files:
+                os.remove(os.path.join(path, name))  # Files of the replaced checkpoint
+
+    @classmethod
+    def load(cls, path, master_key, backend='serial', workers=None, verbose=False, metrics=None):
+        """
+        Restore a SEAL instance from a checkpoint written by save().
+        :param path: Checkpoint directory.
+        :param master_key: The master key given to save().
+        :param backend: Partition backend for the restored instance (see __init__).
+        :param workers: Number of threads or processes for the parallel backends.
+        :param verbose: Print a line for every inserted record and query.
+        :param metrics: Metrics hook for the restored instance (see __init__).
+        """
+        with open(os.path.join(path, CHECKPOINT_MANIFEST), 'r') as f:
+            manifest = json.load(f)
+        if manifest.get("format") != CHECKPOINT_FORMAT:
+            raise ValueError(f"Unsupported checkpoint format in '{path}'.")
+        kek = EncryptionUtils.derive_key(master_key, bytes.fromhex(manifest["salt"]))
+        try:
+            key = EncryptionUtils.decrypt_blob(kek, bytes.fromhex(manifest["wrapped_key"]))
+        except ValueError:
+            raise ValueError("Wrong master key or corrupted checkpoint.") from None
+
+        seal = cls.__new__(cls)
+        for name, value in manifest["config"].items():
+            setattr(seal, name, value)
+        seal.searchable_fields = frozenset(seal.searchable_fields)
+        seal.num_orams = 2 ** seal.alpha
+        seal.codec = RecordCodec(FIELD_TO_COLUMN, seal.record_size)
+        seal._init_cache()
+        seal.verbose = verbose
+        seal.encryption = EncryptionUtils(key=key)
+        seal.next_record_id = manifest["next_record_id"]
+
+        # Check the database first: a stale checkpoint must not overwrite the live tree files
+        seal.conn = seal.connect_db()
+        (generation,) = seal.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        if generation != manifest["generation"]:
+            seal.conn.close()
+            raise ValueError(f"The database '{seal.db_file}' was modified after the checkpoint in '{path}' "
+                             f"was saved; save a new checkpoint instead of loading this one.")
+        if manifest["trees"]:
+            os.makedirs(seal.oram_dir, exist_ok=True)
+        for oram_id, name in enumerate(manifest["trees"]):
+            seal._copy_file(os.path.join(path, name), seal._tree_path(oram_id))
+
+        # Partition files are authenticated before they are unpickled
+        orams = []
+        for name in manifest["partitions"]:
+            with open(os.path.join(path, name), 'rb') as f:
+                try:
+                    state = EncryptionUtils.decrypt_blob(kek, f.read())
+                except ValueError:
+                    raise ValueError("Wrong master key or corrupted checkpoint.") from None
+            orams.append(pickle.loads(state))
+        seal._start_partitions(orams, backend, workers)
+        seal._set_metrics(metrics)
+        return seal
+
+    @staticmethod
+    def _write_file(file_path, data):
+        """Write a file atomically by renaming a fully written temporary file over it."""
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+
+    @staticmethod
+    def _copy_file(src_path, file_path):
+        """Copy a file atomically, like _write_file()."""
+        tmp_path = file_path + ".tmp"
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, file_path)
+
+    def close(self):
+        """Shut down partition workers, close memory-mapped trees and close the database connection."""
+        if self.oram_dir is not None:
+            self.partitions.call('close')
+        self.partitions.close()
+        self.conn.close()
+
     def pad_results(self, results):
         """Pad the results to the next power-of-x."""
         current_length = len(results)
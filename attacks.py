@@ -0,0 +1,330 @@
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib.pyplot as plt
+import numpy as np
+from SEAL import SEAL, MEMORY_DB
+from experiments import read_data_from_csv, write_to_report
+
+ALPHA_VALUES = (1, 2, 3, 4, 5)
+X_VALUES = (2, 3, 4)
+QUERY_DISTRIBUTIONS = ('data', 'uniform', 'zipf')
+
+_worker_data = None
+_worker_histograms = {}
+
+
+def _init_worker(csv_path):
+    """Load the dataset once per worker process; histograms are built lazily and reused across tasks."""
+    global _worker_data
+    _worker_data = read_data_from_csv(csv_path)
+    _worker_histograms.clear()
+
+
+def value_histogram(data, field):
+    """
+    Count every value of a field in one pass.
+    Values are compared as strings, as SEAL tokenizes them.
+    :return: (sorted value labels, match count per label, label index of every record) as NumPy arrays.
+    """
+    labels, codes, counts = np.unique(np.array([str(record[field]) for record in data]),
+                                      return_inverse=True, return_counts=True)
+    return labels, counts, codes
+
+
+def query_weights(counts, distribution='data', zipf_s=1.1):
+    """
+    Probability of querying each value.
+    'data' follows the values' frequencies, 'uniform' weighs all values equally and
+    'zipf' weighs the value of frequency rank r by 1 / r ** zipf_s.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    if distribution == 'data':
+        weights = counts
+    elif distribution == 'uniform':
+        weights = np.ones_like(counts)
+    elif distribution == 'zipf':
+        ranks = np.empty(len(counts))
+        ranks[np.argsort(-counts, kind='stable')] = np.arange(1, len(counts) + 1)
+        weights = 1 / ranks ** zipf_s
+    else:
+        raise ValueError(f"Unsupported query distribution '{distribution}'.")
+    return weights / weights.sum()
+
+
+def sample_queries(counts, num_queries, distribution='data', zipf_s=1.1, seed=0):
+    """Draw num_queries value indices from query_weights(); returns a NumPy array."""
+    rng = np.random.default_rng(seed)
+    return rng.choice(len(counts), size=num_queries, p=query_weights(counts, distribution, zipf_s))
+
+
+def _paths_per_partition(seal):
+    """Drain the partitions' traces and count the paths each one read since the last drain."""
+    return [sum(len(leaves) for leaves in trace) for trace in seal.partitions.call('drain_trace')]
+
+
+def record_query_traces(seal, field, labels):
+    """
+    Run query_by_field once per value and record what the server observes.
+    The ORAM leaves are fresh random draws on every access, so the server-visible shape of a
+    query is the number of paths read in each partition; that and the padded result size only
+    depend on the value, so one recorded query per value stands for all repeats of it.
+    :param labels: Values to query, e.g. from value_histogram().
+    :return: Dict with 'volumes' (padded result size per value) and 'paths' (values x partitions
+             array of paths read).
+    """
+    seal.partitions.call('enable_trace')
+    try:
+        volumes = np.empty(len(labels), dtype=np.int64)
+        paths = np.empty((len(labels), seal.num_orams), dtype=np.int64)
+        for i, label in enumerate(labels):
+            volumes[i] = len(seal.query_by_field(field, label, fields=[field]))
+            paths[i] = _paths_per_partition(seal)
+    finally:
+        seal.partitions.call('enable_trace', False)
+    return {"volumes": volumes, "paths": paths}
+
+
+def record_retrieval_traces(seal, record_ids):
+    """
+    Retrieve records one at a time and record the paths read in each partition per retrieval.
+    :return: Array of shape (len(record_ids), partitions).
+    """
+    seal.partitions.call('enable_trace')
+    try:
+        paths = np.empty((len(record_ids), seal.num_orams), dtype=np.int64)
+        for i, record_id in enumerate(record_ids):
+            seal.retrieve_record(int(record_id))
+            paths[i] = _paths_per_partition(seal)
+    finally:
+        seal.partitions.call('enable_trace', False)
+    return paths
+
+
+def check_constant_access(seal, record_ids):
+    """
+    Check that a cache hit looks like a miss to the server at every ORAM level.
+    Each record is dropped from the cache and retrieved twice, a miss and then a hit; the number
+    of paths read per batch is compared in every partition and in every ORAM of a recursive
+    position map, which the dummy access standing in for a hit has to reach as well.
+    :return: IDs whose hit was distinguishable from their miss (empty if constant access holds).
+    """
+    if seal.cache is None or not seal.cache_constant_access:
+        raise ValueError("Constant access needs a record cache with cache_constant_access=True.")
+    seal.partitions.call('enable_trace', True, True)
+    try:
+        leaks = []
+        for record_id in record_ids:
+            record_id = int(record_id)
+            seal.cache.invalidate(record_id)
+            shapes = []
+            for _ in range(2):
+                seal.retrieve_record(record_id)
+                shapes.append([[[len(leaves) for leaves in trace] for trace in levels]
+                               for levels in seal.partitions.call('drain_trace', True)])
+            if shapes[0] != shapes[1]:
+                leaks.append(record_id)
+    finally:
+        seal.partitions.call('enable_trace', False)
+    return leaks
+
+
+def _groups(signatures):
+    """Index of each row's distinct signature."""
+    signatures = np.asarray(signatures).reshape(len(signatures), -1)
+    return np.unique(signatures, axis=0, return_inverse=True)[1].reshape(-1)
+
+
+def volumetric_scores(signatures, counts, query_codes, prior=None, tolerance=0):
+    """
+    Score a volumetric attack: the adversary knows the value histogram, sees each query's
+    signature and guesses the most likely value among those with that signature.
+    :param signatures: Per value signature (padded volume, or a row of per-partition path counts).
+    :param counts: Match count per value.
+    :param query_codes: Value index of every query.
+    :param prior: Adversary's prior over values (defaults to the empirical query frequencies).
+    :param tolerance: Largest error in matches for which an inferred result size counts as recovered.
+    :return: Dict with the query recovery rate, the result size recovery rate and the fraction
+             of values with a unique signature, rates in percent.
+    """
+    counts = np.asarray(counts)
+    if prior is None:
+        prior = np.bincount(query_codes, minlength=len(counts))
+    groups = _groups(signatures)
+    # Best value of every group: sort by group, most likely first, and keep each group's first entry
+    order = np.lexsort((-np.asarray(prior), groups))
+    first = np.r_[True, groups[order][1:] != groups[order][:-1]]
+    best = np.empty(groups.max() + 1, dtype=np.int64)
+    best[groups[order][first]] = order[first]
+    guesses = best[groups[query_codes]]
+    return {
+        "query_recovery": 100 * float(np.mean(guesses == query_codes)),
+        "size_recovery": 100 * float(np.mean(np.abs(counts[guesses] - counts[query_codes]) <= tolerance)),
+        "unique_values": 100 * float(np.mean(np.bincount(groups)[groups] == 1)),
+    }
+
+
+def linkage_scores(signatures, truth):
+    """
+    Score an access-pattern linkage attack: the adversary declares two accesses to be for the
+    same value (or record) exactly when their signatures are equal. Computed over all pairs
+    from group sizes, without building the pair matrix.
+    :param signatures: Per access signature rows.
+    :param truth: What each access was really for (value index or record ID).
+    :return: Dict with pair accuracy, precision and recall in percent.
+    """
+    groups = _groups(signatures)
+    truth = np.unique(np.asarray(truth), return_inverse=True)[1].reshape(-1)
+
+    def pairs(labels):
+        sizes = np.bincount(labels).astype(np.float64)
+        return float(np.sum(sizes * (sizes - 1) / 2))
+
+    n = len(groups)
+    total = n * (n - 1) / 2
+    linked = pairs(groups)
+    related = pairs(truth)
+    both = pairs(groups * (truth.max() + 1) + truth)
+    return {
+        "accuracy": 100 * (total - linked - related + 2 * both) / total if total else 100.0,
+        "precision": 100 * both / linked if linked else 100.0,
+        "recall": 100 * both / related if related else 100.0,
+    }
+
+
+def evaluate_setting(data, alpha, x, field="RACE", num_queries=5000, distribution='data', num_retrievals=2000,
+                     seed=0, histogram=None, **seal_options):
+    """
+    Measure one SEAL configuration's leakage against query and retrieval workloads.
+    Volumetric attacks are scored on two views of each query: the padded result size alone
+    ('volume') and the paths read per partition from the recorded ORAM traces ('oram').
+    Linkage attacks are scored on the ORAM traces of queries and of record retrievals.
+    :param histogram: Precomputed value_histogram(data, field) (computed if None).
+    :param seal_options: Further SEAL arguments (Z, position_map, cache_size, ...).
+    :return: Dict with the parameters, timings and scores, and with cache_constant_access set, the
+             number of retrieved records whose cache hit was told apart from a miss (else None).
+    """
+    random.seed(seed)  # PathORAM leaf choices
+    labels, counts, _ = histogram if histogram is not None else value_histogram(data, field)
+    query_codes = sample_queries(counts, num_queries, distribution, seed=seed)
+    retrieval_ids = 1 + sample_queries(np.ones(len(data)), num_retrievals, 'zipf', seed=seed)
+
+    seal = SEAL(alpha=alpha, x=x, db_path=MEMORY_DB, expected_records=len(data), **seal_options)
+    try:
+        start_time = time.perf_counter()
+        seal.insert_records(data)
+        insert_seconds = time.perf_counter() - start_time
+
+        # Each distinct value is queried once; its trace stands for every query of it.
+        # Scores are over the queried values, indexed by position in 'queried'
+        queried, query_codes = np.unique(query_codes, return_inverse=True)
+        counts = counts[queried]
+        start_time = time.perf_counter()
+        traces = record_query_traces(seal, field, labels[queried])
+        query_seconds = (time.perf_counter() - start_time) / len(queried)
+        volumes, paths = traces["volumes"], traces["paths"]
+
+        start_time = time.perf_counter()
+        retrieval_paths = record_retrieval_traces(seal, retrieval_ids)
+        retrieve_seconds = (time.perf_counter() - start_time) / num_retrievals
+        constant_access_leaks = None
+        if seal.cache_constant_access:
+            constant_access_leaks = len(check_constant_access(seal, np.unique(retrieval_ids)))
+    finally:
+        seal.close()
+
+    return {
+        "params": {"alpha": alpha, "x": x, "field": field, "distribution": distribution,
+                   "queries": num_queries, "retrievals": num_retrievals, "records": len(data)},
+        "insert_seconds": insert_seconds,
+        "query_seconds": query_seconds,
+        "retrieve_seconds": retrieve_seconds,
+        "padding_overhead": float(np.sum(volumes[query_codes]) / max(1, np.sum(counts[query_codes]))),
+        "volume": volumetric_scores(volumes, counts, query_codes),
+        "oram": volumetric_scores(paths, counts, query_codes),
+        "query_linkage": linkage_scores(paths[query_codes], query_codes),
+        "retrieval_linkage": linkage_scores(retrieval_paths, retrieval_ids),
+        "constant_access_leaks": constant_access_leaks,
+    }
+
+
+def _run_setting(task):
+    index, alpha, x, options = task
+    field = options["field"]
+    if field not in _worker_histograms:
+        _worker_histograms[field] = value_histogram(_worker_data, field)
+    return index, evaluate_setting(_worker_data, alpha, x, histogram=_worker_histograms[field], **options)
+
+
+def evaluate_grid(csv_path, alphas=ALPHA_VALUES, xs=X_VALUES, workers=None, field="RACE", num_queries=5000,
+                  distribution='data', num_retrievals=2000, seed=0, **seal_options):
+    """
+    Run evaluate_setting for every alpha/x pair in a process pool.
+    :param csv_path: Arrests CSV file.
+    :param workers: Number of worker processes (defaults to the CPU count).
+    :return: List of evaluate_setting results in grid order.
+    """
+    options = {"field": field, "num_queries": num_queries, "distribution": distribution,
+               "num_retrievals": num_retrievals, "seed": seed, **seal_options}
+    tasks = [(index, alpha, x, options) for index, (alpha, x) in enumerate(itertools.product(alphas, xs))]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(csv_path,)) as executor:
+        return [result for _, result in sorted(executor.map(_run_setting, tasks), key=lambda item: item[0])]
+
+
+def report_grid(results, report_file=None):
+    """Print one line per setting (and append it to report_file if given)."""
+    for result in results:
+        params = result["params"]
+        line = (f"Alpha = {params['alpha']}, X = {params['x']}: "
+                f"query {result['query_seconds'] * 1e3:.2f} ms, padding x{result['padding_overhead']:.2f}, "
+                f"volume recovery {result['volume']['query_recovery']:.2f}%, "
+                f"ORAM trace recovery {result['oram']['query_recovery']:.2f}%, "
+                f"query linkage precision {result['query_linkage']['precision']:.2f}%, "
+                f"retrieval linkage precision {result['retrieval_linkage']['precision']:.2f}%")
+        print(line)
+        if report_file is not None:
+            write_to_report(line, report_file)
+
+
+def plot_tradeoff(results, plot_file='attack_tradeoff.png'):
+    """Plot volumetric query recovery against query latency, one point per alpha/x setting."""
+    for view, marker in (("volume", 'o'), ("oram", 's')):
+        plt.scatter([result["query_seconds"] * 1e3 for result in results],
+                    [result[view]["query_recovery"] for result in results], marker=marker, label=view)
+    for result in results:
+        plt.annotate(f"α={result['params']['alpha']}, x={result['params']['x']}",
+                     (result["query_seconds"] * 1e3, result["volume"]["query_recovery"]), fontsize=7)
+    plt.xlabel('Query latency (ms)')
+    plt.ylabel('Query recovery (%)')
+    plt.title('Volumetric Attack Success vs Query Latency (SEAL)')
+    plt.legend()
+    plt.grid(True)
+    plt.savefig(plot_file)
+    plt.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate leakage attacks over a grid of SEAL parameters.")
+    parser.add_argument("--csv", default="Arrests_20250316.csv")
+    parser.add_argument("--alpha", type=int, nargs="+", default=list(ALPHA_VALUES))
+    parser.add_argument("--x", type=int, nargs="+", default=list(X_VALUES))
+    parser.add_argument("--field", default="RACE")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--retrievals", type=int, default=2000)
+    parser.add_argument("--distribution", choices=QUERY_DISTRIBUTIONS, default='data')
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default=None, help="Append the results to this report file.")
+    parser.add_argument("--plot", default="attack_tradeoff.png")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    results = evaluate_grid(args.csv, args.alpha, args.x, args.workers, args.field, args.queries,
+                            args.distribution, args.retrievals, args.seed)
+    report_grid(results, args.report)
+    plot_tradeoff(results, args.plot)
+    print(f"Evaluated {len(results)} settings in {time.time() - start_time:.2f} seconds "
+          f"on {args.workers or os.cpu_count()} workers")
@@ -0,0 +1,268 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import psutil
+from SEAL import SEAL, MEMORY_DB
+from Metrics import Metrics, percentile
+from experiments import read_data_from_csv
+
+DEFAULT_CSV = "Arrests_20250316.csv"
+LATENCY_PERCENTILES = (50, 95, 99)
+# Result metrics compared between runs; True when larger values are better
+COMPARED_METRICS = {
+    "insert.records_per_sec": True,
+    "retrieve.p50": False, "retrieve.p95": False, "retrieve.p99": False,
+    "query.p50": False, "query.p95": False, "query.p99": False,
+    "memory.rss_delta_bytes": False,
+    "retrieve.bytes_per_op": False,
+    "query.bytes_per_op": False,
+}
+
+
+def load_dataset(spec, seed=0, csv_path=DEFAULT_CSV):
+    """
+    Load a dataset by name: 'arrests' (the arrests CSV), or 'scaled:<rows>' for the arrests
+    rows resampled with a seeded RNG to the given size, with fresh unique CB_NO values.
+    :param csv_path: The arrests CSV file.
+    """
+    data = read_data_from_csv(csv_path)
+    if spec == "arrests":
+        return data
+    kind, _, rows = spec.partition(":")
+    if kind != "scaled" or not rows.isdigit():
+        raise ValueError(f"Unknown dataset '{spec}'; use 'arrests' or 'scaled:<rows>'.")
+    rng = random.Random(seed)
+    scaled = []
+    for i in range(int(rows)):
+        record = dict(rng.choice(data))
+        record["CB_NO"] = 90000000 + i
+        scaled.append(record)
+    return scaled
+
+
+def summarize_latencies(samples):
+    """Return p50/p95/p99, mean and max of latency samples in seconds."""
+    samples = sorted(samples)
+    summary = {f"p{p}": percentile(samples, p) for p in LATENCY_PERCENTILES}
+    summary["mean"] = sum(samples) / len(samples)
+    summary["max"] = samples[-1]
+    return summary
+
+
+def _bytes_touched(seal, record_size):
+    """Drain the partitions' ORAM metrics and return the bytes read plus written since the last call."""
+    block_bytes = seal.Z * (record_size + 16)  # Encrypted payloads in one bucket
+    total = 0
+    for snapshot in seal.partitions.call('metrics_snapshot'):
+        total += sum(snapshot["samples"].get("oram.nodes_read", ()))
+        total += sum(snapshot["samples"].get("oram.nodes_written", ()))
+    return total * block_bytes
+
+
+def run_case(data, alpha, x, Z, N=None, num_retrievals=200, num_queries=50, warmup=10, batch_size=1000,
+             query_field="RACE", seed=0, backend='serial'):
+    """
+    Benchmark one SEAL configuration: insert throughput, retrieve_record latency and
+    query_by_field latency, with process memory and ORAM bytes touched per operation.
+    :param data: Records to insert.
+    :param N: Initial blocks per ORAM (None lets SEAL size the partitions for the data).
+    :param num_retrievals: Timed retrieve_record calls on random record IDs.
+    :param num_queries: Timed query_by_field calls on values drawn from the records.
+    :param warmup: Untimed calls before each timed phase.
+    :param seed: Seed of the RNGs picking record IDs, query values and ORAM leaves.
+    :return: Dict with the parameters and the measurements.
+    """
+    random.seed(seed)  # PathORAM leaf choices
+    rng = random.Random(seed)
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    seal = SEAL(N=N, Z=Z, alpha=alpha, x=x, db_path=MEMORY_DB, backend=backend, metrics=Metrics(),
+                expected_records=len(data))
+    try:
+        # Insert throughput, timed per committed batch
+        insert_latencies = []
+        for start in range(0, len(data), batch_size):
+            start_time = time.perf_counter()
+            seal.insert_records(data[start:start + batch_size], batch_size=batch_size)
+            insert_latencies.append(time.perf_counter() - start_time)
+        insert_seconds = sum(insert_latencies)
+        insert_bytes = _bytes_touched(seal, seal.record_size)
+
+        record_ids = [rng.randrange(1, seal.next_record_id) for _ in range(warmup + num_retrievals)]
+        for record_id in record_ids[:warmup]:
+            seal.retrieve_record(record_id)
+        _bytes_touched(seal, seal.record_size)
+        retrieve_latencies = []
+        for record_id in record_ids[warmup:]:
+            start_time = time.perf_counter()
+            seal.retrieve_record(record_id)
+            retrieve_latencies.append(time.perf_counter() - start_time)
+        retrieve_bytes = _bytes_touched(seal, seal.record_size)
+
+        # Query values follow the data distribution, so frequent values are queried more often
+        values = [str(rng.choice(data)[query_field]) for _ in range(warmup + num_queries)]
+        for value in values[:warmup]:
+            seal.query_by_field(query_field, value)
+        _bytes_touched(seal, seal.record_size)
+        query_latencies = []
+        padding = 0
+        for value in values[warmup:]:
+            start_time = time.perf_counter()
+            results = seal.query_by_field(query_field, value)
+            query_latencies.append(time.perf_counter() - start_time)
+            padding += results.count('dummy')
+        query_bytes = _bytes_touched(seal, seal.record_size)
+        rss_after = process.memory_info().rss
+    finally:
+        seal.close()
+
+    return {
+        "params": {"alpha": alpha, "x": x, "Z": Z, "N": seal.N, "records": len(data), "backend": backend},
+        "insert": {
+            "records_per_sec": len(data) / insert_seconds,
+            "seconds": insert_seconds,
+            "batch": summarize_latencies(insert_latencies),
+            "bytes_per_record": insert_bytes / len(data),
+        },
+        "retrieve": {**summarize_latencies(retrieve_latencies), "bytes_per_op": retrieve_bytes / num_retrievals},
+        "query": {**summarize_latencies(query_latencies), "bytes_per_op": query_bytes / num_queries,
+                  "dummy_records_per_query": padding / num_queries},
+        "memory": {"rss_bytes": rss_after, "rss_delta_bytes": rss_after - rss_before},
+    }
+
+
+def run_grid(dataset="arrests", alphas=(2,), xs=(2,), Zs=(4,), Ns=(None,), seed=0, output=None,
+             csv_path=DEFAULT_CSV, **kwargs):
+    """
+    Run run_case over the product of the alpha, x, Z and N grids.
+    :param dataset: Dataset spec for load_dataset().
+    :param csv_path: The arrests CSV file the dataset is built from.
+    :param output: JSON file for the results (None to only return them).
+    :param kwargs: Remaining run_case options (num_retrievals, num_queries, warmup, backend, ...).
+    :return: Dict with run metadata and one result per grid point.
+    """
+    data = load_dataset(dataset, seed, csv_path)
+    results = []
+    for alpha, x, Z, N in itertools.product(alphas, xs, Zs, Ns):
+        result = run_case(data, alpha, x, Z, N, seed=seed, **kwargs)
+        results.append(result)
+        print(f"alpha={alpha} x={x} Z={Z} N={result['params']['N']}: "
+              f"{result['insert']['records_per_sec']:.0f} inserts/s, "
+              f"retrieve p50 {result['retrieve']['p50'] * 1e3:.2f} ms, "
+              f"query p50 {result['query']['p50'] * 1e3:.2f} ms")
+
+    run = {
+        "meta": {
+            "dataset": dataset,
+            "csv": csv_path,
+            "seed": seed,
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": _git_commit(),
+            "options": kwargs,
+        },
+        "results": results,
+    }
+    if output is not None:
+        with open(output, 'w') as f:
+            json.dump(run, f, indent=2)
+    return run
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _case_key(params):
+    return tuple(sorted(params.items()))
+
+
+def _metric(result, name):
+    section, key = name.split(".")
+    return result[section][key]
+
+
+def compare_runs(baseline, current, threshold=0.10):
+    """
+    Compare two runs from run_grid and flag metrics that got worse by more than threshold.
+    :param baseline: Baseline run (dict or JSON file path).
+    :param current: Current run (dict or JSON file path).
+    :param threshold: Allowed relative slowdown, e.g. 0.10 for 10%.
+    :return: List of (params, metric, baseline value, current value, relative change) regressions.
+    """
+    runs = []
+    for run in (baseline, current):
+        if isinstance(run, str):
+            with open(run, 'r') as f:
+                run = json.load(f)
+        runs.append({_case_key(result["params"]): result for result in run["results"]})
+    baseline_cases, current_cases = runs
+
+    regressions = []
+    for key in sorted(baseline_cases.keys() & current_cases.keys()):
+        for name, higher_is_better in COMPARED_METRICS.items():
+            old = _metric(baseline_cases[key], name)
+            new = _metric(current_cases[key], name)
+            if old <= 0:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            status = "REGRESSION" if worse > threshold else "ok"
+            print(f"{dict(key)} {name:<24} {old:14.6g} -> {new:14.6g} ({change:+.1%}) {status}")
+            if worse > threshold:
+                regressions.append((dict(key), name, old, new, change))
+    unmatched = baseline_cases.keys() ^ current_cases.keys()
+    if unmatched:
+        print(f"{len(unmatched)} configurations appear in only one of the runs and were skipped.")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SEAL performance benchmark suite.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run a benchmark grid and write the results as JSON.")
+    run.add_argument("--dataset", default="arrests", help="'arrests' or 'scaled:<rows>'.")
+    run.add_argument("--csv", default=DEFAULT_CSV, help="Arrests CSV the dataset is built from.")
+    run.add_argument("--alpha", type=int, nargs="+", default=[2])
+    run.add_argument("--x", type=int, nargs="+", default=[2])
+    run.add_argument("--Z", type=int, nargs="+", default=[4])
+    run.add_argument("--N", type=int, nargs="+", default=[None], help="Blocks per ORAM (default: sized to the data).")
+    run.add_argument("--retrievals", type=int, default=200)
+    run.add_argument("--queries", type=int, default=50)
+    run.add_argument("--warmup", type=int, default=10)
+    run.add_argument("--backend", default="serial")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--output", default="benchmark_results.json")
+
+    compare = commands.add_parser("compare", help="Flag regressions between two result files.")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run_grid(args.dataset, args.alpha, args.x, args.Z, args.N, seed=args.seed, output=args.output,
+                 csv_path=args.csv, num_retrievals=args.retrievals, num_queries=args.queries, warmup=args.warmup,
+                 backend=args.backend)
+        print(f"Results written to {args.output}")
+        return 0
+    regressions = compare_runs(args.baseline, args.current, args.threshold)
+    print(f"{len(regressions)} regressions above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
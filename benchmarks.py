@@ -0,0 +1,408 @@
+import hashlib
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from Crypto.Util.Padding import pad, unpad
+from PathORAM import PathORAM
+from BaselinePathORAM import BaselinePathORAM
+from MmapPathORAM import MmapPathORAM
+from SEAL import SEAL, FIELD_TO_COLUMN, DATE_FIELD, parse_date
+from EncryptionUtils import EncryptionUtils
+from Metrics import Metrics
+from RecordCodec import RecordCodec
+from experiments import read_data_from_csv
+
+# Benchmark: per-access cost of the original list-stash Path ORAM and the current engine
+def benchmark_oram_engines(exponents=range(10, 21), num_ops=1000, Z=4, seed=0):
+    results = []
+    for exponent in exponents:
+        N = 2 ** exponent
+        rng = random.Random(seed)
+        block_ids = [rng.randrange(N) for _ in range(num_ops)]
+
+        for engine in (BaselinePathORAM, PathORAM):
+            random.seed(seed)
+            oram = engine(N=N, Z=Z)
+
+            start_time = time.perf_counter()
+            for block_id in block_ids:
+                oram.access('write', block_id, b'block-%d' % block_id)
+            # Count reads that do not return the written block, so speed is not bought with data loss
+            lost = 0
+            for block_id in block_ids:
+                if oram.access('read', block_id) != b'block-%d' % block_id:
+                    lost += 1
+            elapsed = time.perf_counter() - start_time
+
+            per_access_us = elapsed / (2 * num_ops) * 1e6
+            results.append((engine.__name__, N, per_access_us, lost))
+            print(f"{engine.__name__:<16} N = 2^{exponent:<2} {per_access_us:10.1f} us/access, "
+                  f"{lost} of {num_ops} reads lost")
+    return results
+
+# Benchmark: equality query latency against table size, with and without the token index
+def benchmark_query_latency(data, sizes=(1000, 5000, 10000, 50000), num_queries=200, seed=0):
+    rng = random.Random(seed)
+    results = []
+    for size in sizes:
+        # Rows beyond the dataset are copies with a unique CB_NO, so every lookup matches one row
+        rows = []
+        for i in range(size):
+            record = dict(data[i % len(data)])
+            if i >= len(data):
+                record["CB_NO"] = f"{record['CB_NO']}-{i // len(data)}"
+            rows.append(record)
+        values = [str(rng.choice(rows)["CB_NO"]) for _ in range(num_queries)]
+
+        seal = SEAL(wal=True, searchable_fields=["CB_NO"])
+        seal.insert_records(rows)
+        timings = {}
+        for mode in ("indexed", "scan"):
+            if mode == "scan":
+                seal.conn.execute("DROP INDEX idx_records_cb_no")
+            start_time = time.perf_counter()
+            for value in values:
+                seal.query_by_field("CB_NO", value)
+            timings[mode] = (time.perf_counter() - start_time) / num_queries * 1e3
+        seal.conn.close()
+
+        results.append((size, timings["indexed"], timings["scan"]))
+        print(f"{size:>8} rows: indexed {timings['indexed']:8.3f} ms/query, "
+              f"full scan {timings['scan']:8.3f} ms/query")
+    return results
+
+# Benchmark: bucket reads and time of per-record ORAM reads against batched access_many for RACE queries
+def benchmark_batched_reads(data, race_values=("BLACK", "WHITE", "WHITE HISPANIC"), N=4096, alpha=2):
+    seal = SEAL(N=N, alpha=alpha, wal=True, searchable_fields=["RACE"])
+    seal.insert_records(data)
+    results = []
+    for race in race_values:
+        token = seal.deterministic_token(race)
+        rows = seal.conn.execute("SELECT id, oram_id FROM records WHERE race = ?", (token,)).fetchall()
+        by_oram = {}
+        for record_id, oram_id in rows:
+            by_oram.setdefault(oram_id, []).append(record_id)
+
+        measurements = {}
+        for mode in ("single", "batched"):
+            buckets_before = sum(oram.buckets_read for oram in seal.orams)
+            start_time = time.perf_counter()
+            for oram_id, record_ids in by_oram.items():
+                oram = seal.orams[oram_id]
+                if mode == "single":
+                    for record_id in record_ids:
+                        oram.access('read', record_id)
+                else:
+                    oram.access_many([('read', record_id, None) for record_id in record_ids])
+            elapsed = time.perf_counter() - start_time
+            measurements[mode] = (sum(oram.buckets_read for oram in seal.orams) - buckets_before, elapsed)
+
+        results.append((race, len(rows), measurements))
+        print(f"RACE = {race:<15} {len(rows):>5} matches: "
+              f"single {measurements['single'][0]:>7} buckets {measurements['single'][1]:.3f}s, "
+              f"batched {measurements['batched'][0]:>7} buckets {measurements['batched'][1]:.3f}s")
+    seal.conn.close()
+    return results
+
+# Benchmark: RACE query and bulk retrieval time per partition backend and worker count
+def benchmark_partition_fanout(data, alpha=5, N=1024, backends=("serial", "thread", "process"),
+                               worker_counts=(1, 2, 4, 8), race_values=("BLACK", "WHITE", "WHITE HISPANIC"),
+                               seed=0):
+    rng = random.Random(seed)
+    results = []
+    for backend in backends:
+        for workers in (worker_counts if backend != "serial" else (1,)):
+            seal = SEAL(N=N, alpha=alpha, wal=True, searchable_fields=["RACE"], backend=backend, workers=workers)
+            seal.insert_records(data)
+            record_ids = [rng.randrange(1, len(data) + 1) for _ in range(2000)]
+
+            start_time = time.perf_counter()
+            for race in race_values:
+                seal.query_by_field("RACE", race)
+            query_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            seal.retrieve_records(record_ids)
+            retrieve_time = time.perf_counter() - start_time
+            seal.close()
+
+            results.append((backend, workers, query_time, retrieve_time))
+            print(f"{backend:<8} workers = {workers}: queries {query_time:.3f}s, "
+                  f"bulk retrieval of {len(record_ids)} records {retrieve_time:.3f}s")
+    return results
+
+# Benchmark: memory and remap latency of the dict, array and recursive position maps
+def benchmark_position_maps(exponents=(12, 16, 18), num_ops=2000, Z=4, seed=0):
+    results = []
+    for exponent in exponents:
+        N = 2 ** exponent
+        for kind in ("dict", "array", "recursive"):
+            random.seed(seed)
+            oram = PathORAM(N=N, Z=Z)
+            # Measure a freshly built map (for 'recursive' this includes its position ORAM trees)
+            tracemalloc.start()
+            position_map = oram._init_position_map(kind)
+            # Map every block once, as a fully loaded ORAM would
+            for block_id in range(N):
+                position_map.remap(block_id, random.randrange(oram.num_leaves))
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            block_ids = [random.randrange(N) for _ in range(num_ops)]
+            start_time = time.perf_counter()
+            for block_id in block_ids:
+                position_map.remap(block_id, random.randrange(oram.num_leaves))
+            per_remap_us = (time.perf_counter() - start_time) / num_ops * 1e6
+
+            results.append((kind, N, memory, per_remap_us))
+            print(f"{kind:<10} N = 2^{exponent:<2} {memory / 2 ** 20:8.2f} MiB, {per_remap_us:8.1f} us/remap")
+    return results
+
+# Benchmark: bytes read and written per access, and access time, for memory-mapped trees
+def benchmark_mmap_storage(exponents=(10, 14, 16), block_sizes=(256, 1024), num_ops=1000, Z=4, seed=0):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for exponent in exponents:
+            N = 2 ** exponent
+            for block_size in block_sizes:
+                random.seed(seed)
+                oram = MmapPathORAM(N=N, Z=Z, path=os.path.join(tmp_dir, "tree.bin"), block_size=block_size,
+                                    position_map="array")
+                block_ids = [random.randrange(N) for _ in range(num_ops)]
+                payload = bytes(block_size)
+
+                start_time = time.perf_counter()
+                for block_id in block_ids:
+                    oram.access('write', block_id, payload)
+                for block_id in block_ids:
+                    oram.access('read', block_id)
+                per_access_us = (time.perf_counter() - start_time) / (2 * num_ops) * 1e6
+                read_per_access = oram.bytes_read / (2 * num_ops)
+                written_per_access = oram.bytes_written / (2 * num_ops)
+                file_size = os.path.getsize(oram.path)
+                oram.close()
+
+                results.append((N, block_size, read_per_access, written_per_access, per_access_us, file_size))
+                print(f"N = 2^{exponent:<2} block_size = {block_size:<5} file {file_size / 2 ** 20:9.1f} MiB: "
+                      f"{read_per_access / 1024:7.1f} KiB read, {written_per_access / 1024:7.1f} KiB written, "
+                      f"{per_access_us:8.1f} us per access")
+    return results
+
+# Benchmark: ORAM block size and decode time of the comma-joined text format against the binary codec
+def benchmark_record_codec(data, record_size=1008, projection=("RACE", "ARREST DATE")):
+    encryption = EncryptionUtils()
+    codec = RecordCodec(FIELD_TO_COLUMN, record_size)
+    text_blocks = [encryption.encrypt_data(",".join(str(value) for value in record.values())) for record in data]
+    binary_blocks = [encryption.encrypt_bytes(codec.encode(record)) for record in data]
+
+    text_sizes = sorted(len(block) for block in text_blocks)
+    binary_sizes = sorted(len(block) for block in binary_blocks)
+    print(f"Text blocks:   {text_sizes[0]}-{text_sizes[-1]} bytes (mean {sum(text_sizes) / len(text_sizes):.0f})")
+    print(f"Binary blocks: {binary_sizes[0]}-{binary_sizes[-1]} bytes (fixed)")
+
+    timings = {}
+    start_time = time.perf_counter()
+    for block in text_blocks:
+        dict(zip(FIELD_TO_COLUMN, encryption.decrypt_data(block).split(',')))
+    timings["text"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for block in binary_blocks:
+        codec.decode(encryption.decrypt_bytes(block))
+    timings["binary"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for block in binary_blocks:
+        codec.decode(encryption.decrypt_bytes(block), list(projection))
+    timings["projection"] = time.perf_counter() - start_time
+
+    for mode, elapsed in timings.items():
+        print(f"Decode {mode:<10} {elapsed / len(data) * 1e6:8.2f} us/record")
+    return text_sizes, binary_sizes, timings
+
+# Benchmark: per-value CBC encryption and SHA-256-keyed tokens against the batched, cached crypto layer
+def benchmark_crypto(data, fields=("RACE", "CHARGE 1 DESCRIPTION", "ARREST DATE")):
+    values = [str(record[field]) for record in data for field in fields]
+    encoded = [value.encode('utf-8') for value in values]
+    key = get_random_bytes(32)
+    encryption = EncryptionUtils(key)
+    timings = {}
+
+    # Previous layer: a new cipher object and key schedule per value
+    start_time = time.perf_counter()
+    legacy = []
+    for value in encoded:
+        cipher = AES.new(key, AES.MODE_CBC)
+        legacy.append(cipher.iv + cipher.encrypt(pad(value, AES.block_size)))
+    timings["encrypt (per-value CBC)"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for ciphertext in legacy:
+        unpad(AES.new(key, AES.MODE_CBC, iv=ciphertext[:16]).decrypt(ciphertext[16:]), AES.block_size)
+    timings["decrypt (per-value CBC)"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for value in encoded:
+        AES.new(hashlib.sha256(value).digest(), AES.MODE_ECB).encrypt(pad(value, AES.block_size))
+    timings["tokens (per-value)"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    batched = encryption.encrypt_many(encoded)
+    timings["encrypt_many"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    encryption.decrypt_many(batched)
+    timings["decrypt_many"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    encryption.tokens_many(values)
+    timings["tokens_many (cached)"] = time.perf_counter() - start_time
+
+    for mode, elapsed in timings.items():
+        print(f"{mode:<24} {elapsed / len(values) * 1e6:8.2f} us/value")
+    print(f"Token cache: {encryption.token_cache_hits} hits, {encryption.token_cache_misses} misses")
+    return timings
+
+# Benchmark: stash size and access latency of a fixed-size ORAM and a growing one as they fill
+def benchmark_online_growth(num_blocks=1 << 15, initial_N=64, Z=4, checkpoints=8, seed=0):
+    random.seed(seed)
+    engines = {
+        "fixed": PathORAM(N=initial_N, Z=Z),
+        "growing": PathORAM(N=initial_N, Z=Z, growth_threshold=1.0),
+    }
+    report = {}
+    for name, oram in engines.items():
+        rows = []
+        step = num_blocks // checkpoints
+        for start in range(0, num_blocks, step):
+            start_time = time.perf_counter()
+            for a in range(start, start + step):
+                oram.access('write', a, a)
+            elapsed = time.perf_counter() - start_time
+            rows.append((start + step, len(oram.stash), oram.N, elapsed / step))
+            print(f"{name:<8} blocks={start + step:>7} stash={len(oram.stash):>6} capacity={oram.N:>7} "
+                  f"{elapsed / step * 1e6:8.1f} us/access")
+        report[name] = rows
+    return report
+
+# Benchmark: ORAM reads and latency of planned conjunctive queries against one padded query per predicate
+def benchmark_conjunctive_queries(data, alpha=2, predicates=(
+        ("and", ("=", "RACE", "BLACK"), ("=", "CHARGE 1 CLASS", "X")),
+        ("and", ("=", "RACE", "WHITE"), ("=", "CHARGE 1 TYPE", "F"), ("=", "CHARGE 1 CLASS", "4")))):
+    seal = SEAL(alpha=alpha, metrics=Metrics(), db_path=':memory:')
+    seal.insert_records(data)
+
+    def oram_reads():
+        return sum(sum(snapshot["samples"].get("oram.batch_ops", ()))
+                   for snapshot in seal.partitions.call('metrics_snapshot'))
+
+    report = []
+    for predicate in predicates:
+        oram_reads()
+        start_time = time.perf_counter()
+        planned = seal.query(predicate)
+        planned_time = time.perf_counter() - start_time
+        planned_reads = oram_reads()
+
+        # Client-side intersection of one padded query per equality
+        start_time = time.perf_counter()
+        result_sets = []
+        for _, field, value in predicate[1:]:
+            results = seal.query_by_field(field, value, fields=["CB_NO"])
+            result_sets.append({record["CB_NO"] for record in results if record != 'dummy'})
+        set.intersection(*result_sets)
+        separate_time = time.perf_counter() - start_time
+        separate_reads = oram_reads()
+
+        print(seal.explain(predicate))
+        print(f"  planned:  {planned_reads:6d} ORAM reads, {planned_time * 1e3:8.2f} ms, {len(planned)} padded results")
+        print(f"  separate: {separate_reads:6d} ORAM reads, {separate_time * 1e3:8.2f} ms")
+        report.append((predicate, planned_reads, separate_reads, planned_time, separate_time))
+    seal.close()
+    return report
+
+# Benchmark: hit rate and retrieval latency of Zipf-distributed record IDs per cache size and policy
+def benchmark_record_cache(data, sizes=(0, 64, 256, 1024), policies=("lru", "lfu"), num_reads=5000,
+                           zipf_s=1.1, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / rank ** zipf_s for rank in range(1, len(data) + 1)]
+    ids = rng.choices(range(1, len(data) + 1), weights=weights, k=num_reads)
+
+    report = []
+    for size in sizes:
+        for policy in (policies if size else policies[:1]):
+            for constant_access in ((False, True) if size else (False,)):
+                random.seed(seed)
+                seal = SEAL(alpha=2, db_path=':memory:', cache_size=size, cache_policy=policy,
+                            cache_constant_access=constant_access)
+                seal.insert_records(data)
+                start_time = time.perf_counter()
+                for record_id in ids:
+                    seal.retrieve_record(record_id)
+                elapsed = time.perf_counter() - start_time
+                stats = seal.cache_stats() or {"hit_rate": 0.0}
+                seal.close()
+                label = f"{policy}{' constant' if constant_access else ''}" if size else "no cache"
+                print(f"cache={size:>5} {label:<13} hit rate {stats['hit_rate']:6.1%} "
+                      f"{elapsed / num_reads * 1e6:8.1f} us/retrieve")
+                report.append((size, policy, constant_access, stats["hit_rate"], elapsed / num_reads))
+    return report
+
+# Benchmark: ARREST DATE range queries through the bucket index against decrypting every record
+def benchmark_range_queries(data, ranges=((date(2014, 6, 1), date(2014, 6, 7)), (date(2014, 6, 1), date(2014, 6, 30)),
+                                          (date(2014, 1, 1), date(2014, 12, 31))),
+                            granularities=("day", "month", "year"), alpha=2):
+    report = []
+    for granularity in granularities:
+        seal = SEAL(alpha=alpha, db_path=':memory:', date_granularity=granularity, metrics=Metrics())
+        seal.insert_records(data)
+        for start, end in ranges:
+            seal.metrics.snapshot(reset=True)
+            start_time = time.perf_counter()
+            results = seal.range_query(start, end, fields=["CB_NO"])
+            elapsed = time.perf_counter() - start_time
+            samples = seal.metrics.snapshot(reset=True)["samples"]
+            matches = len(results) - results.count('dummy')
+            read = matches + int(samples["seal.range_edge_records"][0])
+            print(f"{granularity:<5} {start} - {end}: {matches:6d} matches, {read:6d} records read, "
+                  f"{elapsed * 1e3:9.2f} ms")
+            report.append((granularity, start, end, matches, read, elapsed))
+        seal.close()
+
+    # Baseline without the bucket index: read and decrypt every record, then filter on the client
+    seal = SEAL(alpha=alpha, db_path=':memory:')
+    seal.insert_records(data)
+    for start, end in ranges:
+        start_time = time.perf_counter()
+        batches = {}
+        for record_id in range(1, seal.next_record_id):
+            batches.setdefault(seal.compute_oram_id(record_id), []).append(('read', record_id, None))
+        encrypted = [value for values in seal.partitions.run(batches).values() for value in values if value is not None]
+        moments = (parse_date(record[DATE_FIELD]) for record in seal._decode_records(encrypted, [DATE_FIELD]))
+        matches = sum(1 for moment in moments if moment is not None and start <= moment.date() <= end)
+        elapsed = time.perf_counter() - start_time
+        print(f"scan  {start} - {end}: {matches:6d} matches, {len(encrypted):6d} records read, "
+              f"{elapsed * 1e3:9.2f} ms")
+        report.append(("scan", start, end, matches, len(encrypted), elapsed))
+    seal.close()
+    return report
+
+if __name__ == "__main__":
+    benchmark_oram_engines()
+    benchmark_position_maps()
+    benchmark_mmap_storage()
+    benchmark_online_growth()
+    data = read_data_from_csv("Arrests_20250316.csv")
+    benchmark_query_latency(data)
+    benchmark_batched_reads(data)
+    benchmark_partition_fanout(data)
+    benchmark_record_codec(data)
+    benchmark_crypto(data)
+    benchmark_conjunctive_queries(data)
+    benchmark_record_cache(data)
+    benchmark_range_queries(data)
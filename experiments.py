@@ -1,6 +1,7 @@
 import os
 import time
 import random
+from collections import Counter
 import matplotlib.pyplot as plt
 import pandas as pd
 from SEAL import SEAL
@@ -15,6 +16,26 @@ def read_data_from_csv(file_path):
     data = df.to_dict('records')
     return data
 
+# Time inserting every record into a fresh SEAL instance
+def time_insert(data, alpha=2, x=2, db_path='encrypted_db.sqlite'):
+    seal = SEAL(alpha=alpha, x=x, db_path=db_path)
+
+    start_time = time.time()
+    seal.insert_records(data)
+    end_time = time.time()
+
+    seal.close()
+    return end_time - start_time
+
+def plot_results(values, execution_times, xlabel, title, plot_file):
+    plt.plot(values, execution_times, marker='o')
+    plt.xlabel(xlabel)
+    plt.ylabel('Execution Time (seconds)')
+    plt.title(title)
+    plt.grid(True)
+    plt.savefig(plot_file)  # Save the plot as a file
+    plt.close()  # Close the plot to free memory
+
 # Experiment 1: Compare execution time for different alpha values
 def experiment_1(data, report_file):
     alpha_values = [1, 2, 3, 4, 5, 6]  # Different alpha values to test
@@ -23,27 +44,14 @@ def experiment_1(data, report_file):
     write_to_report("Fixed x for this experiment: 2", report_file)
 
     for a in alpha_values:
-        seal = SEAL(alpha=a)
-
-        start_time = time.time()
-        for record in data:
-            seal.insert_record(record)
-        end_time = time.time()
-
-        execution_time = end_time - start_time
+        execution_time = time_insert(data, alpha=a)
         execution_times.append(execution_time)
         print(f"Alpha = {a}, Execution Time = {execution_time:.2f} seconds")
         write_to_report(f"Alpha = {a}, Execution Time = {execution_time:.2f} seconds", report_file)
 
-
     # Plot results
-    plt.plot(alpha_values, execution_times, marker='o')
-    plt.xlabel('Alpha (α)')
-    plt.ylabel('Execution Time (seconds)')
-    plt.title('Execution Time vs Alpha (SEAL)')
-    plt.grid(True)
-    plt.savefig('experiment_1_alpha_vs_time.png')  # Save the plot as a file
-    plt.close()  # Close the plot to free memory
+    plot_results(alpha_values, execution_times, 'Alpha (α)', 'Execution Time vs Alpha (SEAL)',
+                 'experiment_1_alpha_vs_time.png')
 
 # Experiment 2: Adjustable padding and its impact on performance
 def experiment_2(data, report_file):
@@ -54,38 +62,29 @@ def experiment_2(data, report_file):
     execution_times = []
 
     for x_val in x_values:
-        seal = SEAL(alpha=a, x=x_val)
-
-        start_time = time.time()
-        for record in data:
-            seal.insert_record(record)
-        end_time = time.time()
-
-        execution_time = end_time - start_time
+        execution_time = time_insert(data, alpha=a, x=x_val)
         execution_times.append(execution_time)
         print(f"Padding Factor (x) = {x_val}, Execution Time = {execution_time:.2f} seconds")
         write_to_report(f"Padding Factor (x) = {x_val}, Execution Time = {execution_time:.2f} seconds", report_file)
 
     # Plot results
-    plt.plot(x_values, execution_times, marker='o')
-    plt.xlabel('Padding Factor (x)')
-    plt.ylabel('Execution Time (seconds)')
-    plt.title('Execution Time vs Padding Factor (SEAL)')
-    plt.grid(True)
-    plt.savefig('experiment_2_padding_vs_time.png')  # Save the plot as a file
-    plt.close()  # Close the plot to free memory
+    plot_results(x_values, execution_times, 'Padding Factor (x)', 'Execution Time vs Padding Factor (SEAL)',
+                 'experiment_2_padding_vs_time.png')
 
-def experiment_3(seal, data, report_file):
+# Attack 1: success rate of inferring true result sizes from padded query results
+def volumetric_attack(seal, data, verbose=False):
     # Simulate attack: Adversary queries specific fields and uses statistical analysis
     field_name = "RACE"
     field_values = ["WHITE", "BLACK", "ASIAN", "HISPANIC"]
     success_count = 0
     total_queries = 0
+    true_sizes = Counter(record[field_name] for record in data)  # One pass instead of one scan per value
 
     for field_value in field_values:
         # Adversary performs query
         padded_results = seal.query_by_field(field_name, field_value)
-        print(padded_results)
+        if verbose:
+            print(padded_results)
 
         # Adversary uses statistical analysis to infer true result size
         # For example, using the mean padding size to estimate true size
@@ -93,7 +92,7 @@ def experiment_3(seal, data, report_file):
         inferred_size = len(padded_results) - mean_padding_size
         inferred_size = max(inferred_size, 0)  # Ensure non-negative
 
-        true_size = sum(1 for record in data if record[field_name] == field_value)
+        true_size = true_sizes[field_value]
 
         # Check if adversary's inference is correct within a tolerance
         tolerance = 2  # Allow some margin of error
@@ -102,7 +101,10 @@ def experiment_3(seal, data, report_file):
         total_queries += 1
 
     # Calculate success rate
-    success_rate = (success_count / total_queries) * 100
+    return (success_count / total_queries) * 100
+
+def experiment_3(seal, data, report_file):
+    success_rate = volumetric_attack(seal, data, verbose=True)
     print(f"Attack 1: Volumetric Leakage Attack")
     write_to_report(f"Attack 1: Volumetric Leakage Attack", report_file)
     print("Alpha for this experiment: 5")
@@ -112,7 +114,8 @@ def experiment_3(seal, data, report_file):
     print(f"Adversary Success Rate: {success_rate:.2f}%")
     write_to_report(f"Adversary Success Rate: {success_rate:.2f}%", report_file)
 
-def experiment_4(seal, data, report_file):
+# Attack 2: success rate of inferring related records from their access patterns
+def access_pattern_attack(seal):
     # Simulate attack: Adversary observes access patterns and uses correlation analysis
     record_ids = [1, 2, 3]  # Example record IDs to access
     success_count = 0
@@ -145,7 +148,10 @@ def experiment_4(seal, data, report_file):
         total_accesses += 1
 
     # Calculate success rate
-    success_rate = (success_count / total_accesses) * 100
+    return (success_count / total_accesses) * 100
+
+def experiment_4(seal, data, report_file):
+    success_rate = access_pattern_attack(seal)
     print(f"Attack 2: Access Pattern Leakage Attack")
     write_to_report(f"Attack 2: Access Pattern Leakage Attack", report_file)
     print("Alpha for this experiment: 5")
@@ -180,8 +186,7 @@ if __name__ == "__main__":
     seal = SEAL(alpha = 5, x = 4)
 
     # Insert records
-    for record in data:
-        seal.insert_record(record)
+    seal.insert_records(data)
 
     print("\nRunning Experiment 3: Attack 1 (Volumetric Leakage)")
     write_to_report("\nRunning Experiment 3: Attack 1 (Volumetric Leakage)", report_file)
@@ -0,0 +1,79 @@
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from EncryptionUtils import EncryptionUtils
+from RecordCodec import RecordCodec
+from SEAL import SEAL, FIELD_TO_COLUMN, encrypt_records
+
+# Per-process encryption state, set up once by the pool initializer
+_worker_encryption = None
+
+_worker_codec = None
+_worker_searchable_fields = None
+_worker_date_granularity = None
+
+def _init_worker(key, record_size, searchable_fields, date_granularity=None):
+    global _worker_encryption, _worker_codec, _worker_searchable_fields, _worker_date_granularity
+    _worker_encryption = EncryptionUtils(key=key)
+    _worker_codec = RecordCodec(FIELD_TO_COLUMN, record_size)
+    _worker_searchable_fields = searchable_fields
+    _worker_date_granularity = date_granularity
+
+def _encrypt_chunk(records):
+    return encrypt_records(_worker_encryption, records, _worker_codec, _worker_searchable_fields,
+                           _worker_date_granularity)
+
+# Read the CSV in chunks of records without loading the whole file
+def read_csv_chunks(file_path, chunk_size):
+    for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+        yield chunk.to_dict('records')
+
+def stream_ingest(seal, file_path, workers=None, chunk_size=500, queue_depth=4, report_interval=1.0):
+    """
+    Stream a CSV file into SEAL.
+    Chunks are encrypted in a process pool while the calling process acts as the single
+    writer stage doing ORAM writes and SQLite inserts in chunk order.
+    :param seal: SEAL instance to insert into.
+    :param file_path: Path to the CSV file.
+    :param workers: Number of encryption worker processes (defaults to the CPU count).
+    :param chunk_size: Number of rows per chunk.
+    :param queue_depth: Maximum number of chunks in flight; bounds memory use.
+    :param report_interval: Seconds between rows/sec progress lines (None to disable).
+    :return: Dict with the number of rows, elapsed seconds and rows/sec.
+    """
+    rows = 0
+    start_time = time.perf_counter()
+    last_report = start_time
+    pending = deque()
+
+    def write_next():
+        nonlocal rows, last_report
+        encrypted_records = pending.popleft().result()
+        seal.store_encrypted_records(encrypted_records)
+        rows += len(encrypted_records)
+
+        now = time.perf_counter()
+        if report_interval is not None and now - last_report >= report_interval:
+            print(f"Ingested {rows} rows ({rows / (now - start_time):.0f} rows/sec)")
+            last_report = now
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(seal.encryption.key, seal.record_size, seal.searchable_fields,
+                                       seal.date_granularity)) as pool:
+        for records in read_csv_chunks(file_path, chunk_size):
+            pending.append(pool.submit(_encrypt_chunk, records))
+            if len(pending) >= queue_depth:
+                write_next()
+        while pending:
+            write_next()
+
+    elapsed = time.perf_counter() - start_time
+    rows_per_sec = rows / elapsed if elapsed > 0 else 0.0
+    print(f"Ingested {rows} rows in {elapsed:.2f} seconds ({rows_per_sec:.0f} rows/sec)")
+    return {"rows": rows, "seconds": elapsed, "rows_per_sec": rows_per_sec}
+
+if __name__ == "__main__":
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "Arrests_20250316.csv"
+    stream_ingest(SEAL(wal=True), file_path)
@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import json
+import queue
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit, parse_qs, quote
+from SEAL import SEAL, MEMORY_DB
+from Metrics import percentile
+from experiments import read_data_from_csv
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                500: "Internal Server Error"}
+
+
+class ConnectionPool:
+    def __init__(self, db_file, size=4):
+        """
+        Fixed-size pool of SQLite connections shared by the service's worker threads.
+        :param db_file: SQLite database file (in-memory databases cannot be shared between connections).
+        :param size: Number of connections.
+        """
+        if db_file == MEMORY_DB:
+            raise ValueError("The service needs a database file; in-memory databases are private to one connection.")
+        self.connections = queue.Queue()
+        for _ in range(size):
+            self.connections.put(sqlite3.connect(db_file, check_same_thread=False))
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, waiting until one is free."""
+        conn = self.connections.get()
+        try:
+            yield conn
+        finally:
+            self.connections.put(conn)
+
+    def close(self):
+        while not self.connections.empty():
+            self.connections.get().close()
+
+
+class SEALService:
+    def __init__(self, seal, pool_size=4, workers=None):
+        """
+        Serve retrieve_record and query_by_field over local HTTP with asyncio.
+        Each ORAM partition has an asyncio lock, so requests that touch different partitions
+        run concurrently on the thread pool while requests for the same partition queue up.
+        SQLite lookups use a shared connection pool.
+        :param seal: SEAL instance whose records are served (inserts stay with its own connection).
+        :param pool_size: Number of SQLite connections in the pool.
+        :param workers: Threads running ORAM accesses, SQLite lookups and decryption
+                        (defaults to one per partition plus the pool size).
+        """
+        self.seal = seal
+        self.pool = ConnectionPool(seal.db_file, pool_size)
+        self.executor = ThreadPoolExecutor(max_workers=workers or seal.num_orams + pool_size)
+        self.partition_locks = None  # Created on the server's event loop
+        self.requests_served = 0
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def _lookup(self, field_name, field_value):
+        with self.pool.connection() as conn:
+            return self.seal.match_batches(field_name, field_value, conn)
+
+    async def _access(self, oram_id, ops):
+        """Run a batch on one partition while holding that partition's lock."""
+        async with self.partition_locks[oram_id]:
+            return await self._run(self.seal.partitions.access_many, oram_id, ops)
+
+    async def retrieve_record(self, record_id, fields=None):
+        """Retrieve and decrypt one record (None if it does not exist)."""
+        oram_id = self.seal.compute_oram_id(record_id)
+        encrypted_data = (await self._access(oram_id, [('read', record_id, None)]))[0]
+        if encrypted_data is None:
+            return None
+        return (await self._run(self.seal._decode_records, [encrypted_data], fields))[0]
+
+    async def query_by_field(self, field_name, field_value, fields=None):
+        """Query records by field value; partitions holding matches are read concurrently."""
+        batches = await self._run(self._lookup, field_name, field_value)
+        oram_ids = list(batches)
+        results = await asyncio.gather(*(self._access(oram_id, batches[oram_id]) for oram_id in oram_ids))
+        return await self._run(self.seal.finish_query, dict(zip(oram_ids, results)), fields)
+
+    async def dispatch(self, method, target):
+        """
+        Route one request.
+        GET /record/<id>[?fields=A,B], GET /query?field=<name>&value=<value>[&fields=A,B] and GET /stats.
+        :return: (HTTP status, JSON-serializable body).
+        """
+        if method != "GET":
+            return 405, {"error": "Only GET is supported."}
+        url = urlsplit(target)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        fields = params["fields"].split(",") if "fields" in params else None
+        parts = [part for part in url.path.split("/") if part]
+
+        if len(parts) == 2 and parts[0] == "record":
+            if not parts[1].isdigit():
+                return 400, {"error": "Record IDs must be integers."}
+            record = await self.retrieve_record(int(parts[1]), fields)
+            return (200, {"record": record}) if record is not None else (404, {"error": "No such record."})
+        if parts == ["query"]:
+            if "field" not in params or "value" not in params:
+                return 400, {"error": "Queries need 'field' and 'value' parameters."}
+            return 200, {"results": await self.query_by_field(params["field"], params["value"], fields)}
+        if parts == ["stats"]:
+            return 200, {"requests_served": self.requests_served, "partitions": self.seal.num_orams,
+                         "stash": await self._run(self.seal.stash_stats)}
+        return 404, {"error": f"Unknown path '{url.path}'."}
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one keep-alive connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                close = headers.get("connection", "").lower() == "close"
+
+                try:
+                    try:
+                        length = int(headers.get("content-length", 0))
+                        if length < 0:
+                            raise ValueError
+                    except ValueError:
+                        close = True  # The body cannot be skipped, so the connection cannot be reused
+                        raise ValueError("Invalid Content-Length header.") from None
+                    if length:
+                        await reader.readexactly(length)  # Bodies are ignored
+                    method, target, _ = request_line.decode('latin-1').split(" ", 2)
+                    status, body = await self.dispatch(method, target)
+                except asyncio.IncompleteReadError:
+                    raise  # The client went away mid-body
+                except ValueError as e:
+                    status, body = 400, {"error": str(e)}
+                except Exception as e:
+                    status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+                self.requests_served += 1
+
+                payload = json.dumps(body).encode('utf-8')
+                writer.write(f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                             f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode('latin-1') + payload)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """Start listening and return the asyncio server."""
+        self.partition_locks = [asyncio.Lock() for _ in range(self.seal.num_orams)]
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self.executor.shutdown()
+        self.pool.close()
+
+
+async def _client(host, port, targets, latencies, errors, deadline):
+    """One load-generator client: send requests over one keep-alive connection until the deadline."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        i = 0
+        while time.perf_counter() < deadline:
+            target = targets[i % len(targets)]
+            i += 1
+            start_time = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1'))
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode('latin-1').partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start_time)
+            if not status_line.split(b" ")[1].startswith((b"2", b"4")):
+                errors.append(status_line)
+    finally:
+        writer.close()
+
+
+async def generate_load(host, port, targets, concurrency_levels=(1, 2, 4, 8, 16, 32), duration=5.0):
+    """
+    Drive the service with an increasing number of concurrent clients.
+    :param targets: Request paths, e.g. from make_targets(); each client starts at a different offset.
+    :param duration: Seconds spent at each concurrency level.
+    :return: List of dicts with concurrency, requests, errors, throughput and latency percentiles.
+    """
+    report = []
+    for concurrency in concurrency_levels:
+        latencies = []
+        errors = []
+        deadline = time.perf_counter() + duration
+        start_time = time.perf_counter()
+        await asyncio.gather(*(_client(host, port, targets[i:] + targets[:i], latencies, errors, deadline)
+                               for i in range(concurrency)))
+        elapsed = time.perf_counter() - start_time
+        latencies.sort()
+        row = {
+            "concurrency": concurrency,
+            "requests": len(latencies),
+            "errors": len(errors),
+            "requests_per_sec": len(latencies) / elapsed,
+            **{f"p{p}_ms": percentile(latencies, p) * 1e3 for p in (50, 95, 99)},
+        }
+        report.append(row)
+        print(f"Concurrency = {concurrency:3d}: {row['requests_per_sec']:8.1f} req/s, "
+              f"p50 {row['p50_ms']:7.2f} ms, p95 {row['p95_ms']:7.2f} ms, p99 {row['p99_ms']:7.2f} ms, "
+              f"{row['errors']} errors")
+    return report
+
+
+def make_targets(data, num_records, query_fraction=0.1, seed=0):
+    """Build a seeded request mix: record retrievals, plus RACE queries for query_fraction of requests."""
+    rng = random.Random(seed)
+    targets = []
+    for _ in range(1000):
+        if rng.random() < query_fraction:
+            targets.append(f"/query?field=RACE&value={quote(str(rng.choice(data)['RACE']))}")
+        else:
+            targets.append(f"/record/{rng.randrange(1, num_records + 1)}")
+    return targets
+
+
+async def _serve(args):
+    data = read_data_from_csv(args.csv)[:args.rows]
+    seal = SEAL(alpha=args.alpha, x=args.x, backend=args.backend, db_path=args.db, expected_records=len(data))
+    seal.insert_records(data)
+    service = SEALService(seal, pool_size=args.pool_size)
+    server = await service.start(args.host, args.port)
+    print(f"Serving {len(data)} records on http://{args.host}:{args.port}")
+    try:
+        if args.load:
+            await generate_load(args.host, args.port, make_targets(data, len(data), args.query_fraction),
+                                duration=args.duration)
+        else:
+            await server.serve_forever()
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.close()
+        seal.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local asyncio HTTP service for SEAL queries.")
+    parser.add_argument("--csv", default="Arrests_20250316.csv")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--alpha", type=int, default=2)
+    parser.add_argument("--x", type=int, default=2)
+    parser.add_argument("--backend", default="serial")
+    parser.add_argument("--db", default="service_db.sqlite")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--load", action="store_true",
+                        help="Run the load generator against the service instead of serving forever.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level.")
+    parser.add_argument("--query-fraction", type=float, default=0.1)
+    asyncio.run(_serve(parser.parse_args()))
@@ -0,0 +1,155 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib.pyplot as plt
+from SEAL import SEAL, MEMORY_DB
+from experiments import (read_data_from_csv, write_to_report, time_insert, plot_results,
+                         volumetric_attack, access_pattern_attack)
+
+ALPHA_VALUES = (1, 2, 3, 4, 5, 6)  # Experiment 1, with x = 2
+X_VALUES = (2, 3, 4, 5, 6, 7)  # Experiment 2, with alpha = 2
+ATTACK_PARAMS = {"alpha": 5, "x": 4}  # Experiments 3 and 4
+
+_worker_data = None
+
+
+def _init_worker(csv_path):
+    """Load the dataset once per worker process instead of pickling it into every task."""
+    global _worker_data
+    _worker_data = read_data_from_csv(csv_path)
+
+
+def sweep_points(alpha_values=ALPHA_VALUES, x_values=X_VALUES):
+    """List the grid points of experiments 1-4 as (experiment, params) tuples."""
+    points = [("experiment_1", {"alpha": a, "x": 2}) for a in alpha_values]
+    points += [("experiment_2", {"alpha": 2, "x": x}) for x in x_values]
+    points.append(("attacks", dict(ATTACK_PARAMS)))
+    return points
+
+
+def _run_point(task):
+    """Run one grid point on its own database and return (index, experiment, params, result)."""
+    index, (experiment, params), db_dir = task
+    db_path = MEMORY_DB if db_dir is None else os.path.join(db_dir, f"sweep_{index}.sqlite")
+    if experiment == "attacks":
+        seal = SEAL(db_path=db_path, **params)
+        start_time = time.time()
+        seal.insert_records(_worker_data)
+        result = {
+            "insert_seconds": time.time() - start_time,
+            "volumetric_success_rate": volumetric_attack(seal, _worker_data),
+            "access_pattern_success_rate": access_pattern_attack(seal),
+        }
+        seal.close()
+    else:
+        result = {"insert_seconds": time_insert(_worker_data, db_path=db_path, **params)}
+    if db_dir is not None:
+        os.remove(db_path)
+    return index, experiment, params, result
+
+
+def run_sweep(csv_path, workers=None, db_dir=None, points=None):
+    """
+    Run the grid points of experiments 1-4 in a process pool, each on an isolated database.
+    :param csv_path: Arrests CSV file.
+    :param workers: Number of worker processes (defaults to the CPU count).
+    :param db_dir: Directory for one SQLite file per grid point (None uses in-memory databases).
+    :param points: Grid points from sweep_points() (defaults to the full grid).
+    :return: (list of (experiment, params, result) in grid order, wall-clock seconds for the sweep).
+    """
+    if points is None:
+        points = sweep_points()
+    if db_dir is not None:
+        os.makedirs(db_dir, exist_ok=True)
+    tasks = [(index, point, db_dir) for index, point in enumerate(points)]
+
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(csv_path,)) as executor:
+        results = sorted(executor.map(_run_point, tasks))
+    wall_time = time.time() - start_time
+    return [(experiment, params, result) for _, experiment, params, result in results], wall_time
+
+
+def report_sweep(results, report_file):
+    """Write the sweep results in the experiment report format and save the experiment 1 and 2 plots."""
+    by_experiment = {}
+    for experiment, params, result in results:
+        by_experiment.setdefault(experiment, []).append((params, result))
+
+    if "experiment_1" in by_experiment:
+        write_to_report("Running Experiment 1: Varying Alpha", report_file)
+        write_to_report("Fixed x for this experiment: 2", report_file)
+        rows = by_experiment["experiment_1"]
+        for params, result in rows:
+            write_to_report(f"Alpha = {params['alpha']}, Execution Time = {result['insert_seconds']:.2f} seconds",
+                            report_file)
+        plot_results([params["alpha"] for params, _ in rows], [result["insert_seconds"] for _, result in rows],
+                     'Alpha (α)', 'Execution Time vs Alpha (SEAL)', 'experiment_1_alpha_vs_time.png')
+
+    if "experiment_2" in by_experiment:
+        write_to_report("\nRunning Experiment 2: Adjustable Padding", report_file)
+        write_to_report("Fixed alpha for this experiment: 2", report_file)
+        rows = by_experiment["experiment_2"]
+        for params, result in rows:
+            write_to_report(f"Padding Factor (x) = {params['x']}, Execution Time = {result['insert_seconds']:.2f} seconds",
+                            report_file)
+        plot_results([params["x"] for params, _ in rows], [result["insert_seconds"] for _, result in rows],
+                     'Padding Factor (x)', 'Execution Time vs Padding Factor (SEAL)',
+                     'experiment_2_padding_vs_time.png')
+
+    for params, result in by_experiment.get("attacks", []):
+        for title, key in (("Attack 1: Volumetric Leakage Attack", "volumetric_success_rate"),
+                           ("Attack 2: Access Pattern Leakage Attack", "access_pattern_success_rate")):
+            write_to_report(f"\n{title}", report_file)
+            write_to_report(f"Alpha for this experiment: {params['alpha']}", report_file)
+            write_to_report(f"X for this experiment: {params['x']}", report_file)
+            write_to_report(f"Adversary Success Rate: {result[key]:.2f}%", report_file)
+
+
+def sweep_scaling(csv_path, worker_counts=None, db_dir=None, plot_file='sweep_scaling.png'):
+    """
+    Time the full sweep for each worker count and plot wall-clock time against the number of cores.
+    :param worker_counts: Worker counts to try (defaults to powers of two up to the CPU count).
+    :return: List of (workers, wall-clock seconds).
+    """
+    if worker_counts is None:
+        cpu_count = os.cpu_count() or 1
+        worker_counts = [1 << i for i in range(cpu_count.bit_length()) if 1 << i <= cpu_count]
+        if worker_counts[-1] != cpu_count:
+            worker_counts.append(cpu_count)
+
+    timings = []
+    for workers in worker_counts:
+        _, wall_time = run_sweep(csv_path, workers=workers, db_dir=db_dir)
+        timings.append((workers, wall_time))
+        print(f"Workers = {workers}, Sweep Time = {wall_time:.2f} seconds")
+
+    plt.plot([workers for workers, _ in timings], [wall_time for _, wall_time in timings], marker='o')
+    plt.xlabel('Worker processes')
+    plt.ylabel('Sweep Time (seconds)')
+    plt.title('Full Sweep Wall-Clock Time vs Cores (SEAL)')
+    plt.grid(True)
+    plt.savefig(plot_file)
+    plt.close()
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run experiments 1-4 as a parallel parameter sweep.")
+    parser.add_argument("--csv", default="Arrests_20250316.csv")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--db-dir", default=None, help="Directory for per-point SQLite files (default: in memory).")
+    parser.add_argument("--report", default="experiment_report.txt")
+    parser.add_argument("--scaling", action="store_true", help="Also time the sweep against the number of workers.")
+    args = parser.parse_args()
+
+    if os.path.exists(args.report):
+        os.remove(args.report)
+    results, wall_time = run_sweep(args.csv, workers=args.workers, db_dir=args.db_dir)
+    report_sweep(results, args.report)
+    serial_time = sum(result["insert_seconds"] for _, _, result in results)
+    print(f"Swept {len(results)} grid points in {wall_time:.2f} seconds "
+          f"({serial_time:.2f} seconds of inserts summed over all points)")
+    if args.scaling:
+        sweep_scaling(args.csv, db_dir=args.db_dir)